@@ -22,6 +22,10 @@ class TransactionInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['debit_amount', 'credit_amount']
 
+    def get_queryset(self, request):
+        # Each inline row is labelled with str(transaction), which reads its account
+        return super().get_queryset(request).select_related('account')
+
 
 @admin.register(JournalEntry)
 class JournalEntryAdmin(admin.ModelAdmin):
@@ -50,6 +54,7 @@ class JournalEntryAdmin(admin.ModelAdmin):
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['journal_entry', 'account', 'amount', 'is_debit', 'description']
+    list_select_related = ['journal_entry', 'account']
     list_filter = ['is_debit', 'journal_entry__date']
     search_fields = ['account__name', 'description']
 
@@ -57,6 +62,7 @@ class TransactionAdmin(admin.ModelAdmin):
 @admin.register(StudentReceipt)
 class StudentReceiptAdmin(admin.ModelAdmin):
     list_display = ['receipt_number', 'date', 'student_name', 'course_name', 'paid_amount', 'created_by']
+    list_select_related = ['created_by']
     list_filter = ['date', 'payment_method']
     search_fields = ['receipt_number', 'student_name', 'course_name']
     readonly_fields = ['receipt_number', 'net_amount', 'created_at']
@@ -65,6 +71,7 @@ class StudentReceiptAdmin(admin.ModelAdmin):
 @admin.register(ExpenseEntry)
 class ExpenseEntryAdmin(admin.ModelAdmin):
     list_display = ['id', 'date', 'description', 'amount', 'created_by']
+    list_select_related = ['created_by']
     list_filter = ['date', 'payment_method']  # تم إزالة 'category' من list_filter
     search_fields = ['description', 'vendor']
 
@@ -104,6 +111,7 @@ class StudentAdmin(admin.ModelAdmin):
 @admin.register(Studentenrollment)
 class StudentenrollmentAdmin(admin.ModelAdmin):
     list_display = ['student', 'course', 'enrollment_date', 'total_amount', 'net_amount', 'amount_paid', 'balance_due', 'is_completed']
+    list_select_related = ['student', 'course']
     list_filter = ['enrollment_date', 'is_completed', 'payment_method']
     search_fields = ['student__name', 'course__name']
     readonly_fields = ['created_at', 'net_amount', 'amount_paid', 'balance_due']
@@ -124,6 +132,7 @@ class StudentenrollmentAdmin(admin.ModelAdmin):
 @admin.register(EmployeeAdvance)
 class EmployeeAdvanceAdmin(admin.ModelAdmin):
     list_display = ['employee_name', 'date', 'amount', 'purpose', 'is_repaid', 'created_by']
+    list_select_related = ['created_by']
     list_filter = ['date', 'is_repaid']
     search_fields = ['employee_name', 'purpose']
     readonly_fields = ['outstanding_amount', 'created_at']
@@ -156,6 +165,7 @@ class AccountingPeriodAdmin(admin.ModelAdmin):
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ['account', 'period', 'budgeted_amount', 'actual_amount', 'variance']
+    list_select_related = ['account', 'period']
     list_filter = ['period']
     search_fields = ['account__name', 'period__name']
     readonly_fields = ['variance']
@@ -164,5 +174,6 @@ class BudgetAdmin(admin.ModelAdmin):
 @admin.register(StudentAccountLink)
 class StudentAccountLinkAdmin(admin.ModelAdmin):
     list_display = ['student', 'account', 'created_at']
+    list_select_related = ['student', 'account']
     search_fields = ['student__full_name', 'account__name']
     readonly_fields = ['created_at']
\ No newline at end of file
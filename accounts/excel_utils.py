@@ -4,14 +4,144 @@ Provides comprehensive Excel export functionality with proper formatting
 """
 
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.table import Table, TableStyleInfo, TableColumn
+from openpyxl.writer.excel import ExcelWriter
+import datetime
 from decimal import Decimal
-from datetime import datetime, date
-from django.http import HttpResponse
-from django.utils import timezone
-import locale
+import re
+import tempfile
+import warnings
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+from django.http import FileResponse
+
+
+# Report layouts shared by the openpyxl and XlsxWriter exporters
+ANALYSIS_TITLE = "تقرير تحليل مراكز التكلفة - Cost Center Analysis Report"
+ANALYSIS_HEADERS = (
+    "رمز المركز", "اسم المركز", "إجمالي المصروفات", "رواتب المدرسين",
+    "مصروفات أخرى", "عدد الدورات", "إجمالي الإيرادات", "الربح/الخسارة"
+)
+CASH_FLOW_TITLE = "تقرير التدفق النقدي لمراكز التكلفة - Cost Center Cash Flow Report"
+CASH_FLOW_HEADERS = (
+    "رمز المركز", "اسم المركز", "التدفق الداخل", "التدفق الخارج",
+    "الرصيد الافتتاحي", "الرصيد الختامي", "الوضع المالي"
+)
+TOTAL_LABEL = "المجموع الكلي - Total"
+
+# Financial position labels indexed by the sign of a balance plus one
+_POSITIONS = ("رصيد سالب - Negative", "متوازن - Balanced", "رصيد موجب - Positive")
+
+# Shared default for missing or empty amounts in the report rows
+_ZERO = 0.0
+
+# Exports stay in memory up to this size before spilling to a temporary file
+SPOOL_MAX_SIZE = 8 << 20
+
+# Deflate level for openpyxl downloads: level 1 compresses the XML parts nearly
+# as well as the default 6 at a fraction of the CPU time
+EXPORT_COMPRESSLEVEL = 1
+
+# Column letters for the report widths (index 1 == "A"), built once per process
+_COL = [''] + [get_column_letter(i) for i in range(1, 33)]
+
+
+def column_letter(col):
+    """Return the column letter for a 1-based index, using the precomputed table"""
+    return _COL[col] if col < len(_COL) else get_column_letter(col)
+
+
+class AnalysisRows:
+    """Float rows of a cost center analysis report, converted while iterating
+    
+    Rows are (code, name, expenses, teacher_salaries, other_expenses,
+    course_count, revenue, profit_loss). The source may be a generator, so
+    rows are produced once; count and totals (same column order from
+    expenses on) are complete after iteration. Shared by every exporter.
+    """
+    
+    def __init__(self, cost_centers_data):
+        self.data = cost_centers_data
+        self.count = 0
+        self.totals = None
+    
+    def __iter__(self):
+        total_expenses = 0.0
+        total_teacher_salaries = 0.0
+        total_other_expenses = 0.0
+        total_revenue = 0.0
+        total_profit_loss = 0.0
+        total_courses = 0
+        count = 0
+        
+        for d in self.data:
+            expenses = float(d.get('total_expenses') or _ZERO)
+            teacher_salaries = float(d.get('teacher_salaries') or _ZERO)
+            other_expenses = float(d.get('other_expenses') or _ZERO)
+            revenue = float(d.get('total_revenue') or _ZERO)
+            course_count = d.get('course_count') or 0
+            profit_loss = revenue - expenses
+            yield (d['code'], d['name'], expenses, teacher_salaries, other_expenses,
+                   course_count, revenue, profit_loss)
+            
+            total_expenses += expenses
+            total_teacher_salaries += teacher_salaries
+            total_other_expenses += other_expenses
+            total_revenue += revenue
+            total_profit_loss += profit_loss
+            total_courses += course_count
+            count += 1
+        
+        self.count = count
+        self.totals = (total_expenses, total_teacher_salaries, total_other_expenses,
+                       total_courses, total_revenue, total_profit_loss)
+
+
+class CashFlowRows:
+    """Float rows of a cost center cash flow report, converted while iterating
+    
+    Rows are (code, name, inflow, outflow, opening_balance, closing_balance,
+    position); after iteration totals holds the four amounts plus the
+    overall position.
+    """
+    
+    def __init__(self, cash_flow_data):
+        self.data = cash_flow_data
+        self.count = 0
+        self.totals = None
+    
+    def __iter__(self):
+        total_inflow = 0.0
+        total_outflow = 0.0
+        total_opening_balance = 0.0
+        total_closing_balance = 0.0
+        count = 0
+        
+        for d in self.data:
+            inflow = float(d.get('inflow') or _ZERO)
+            outflow = float(d.get('outflow') or _ZERO)
+            opening_balance = float(d.get('opening_balance') or _ZERO)
+            closing_balance = opening_balance + inflow - outflow
+            position = _POSITIONS[(closing_balance > 0) - (closing_balance < 0) + 1]
+            yield (d['code'], d['name'], inflow, outflow, opening_balance, closing_balance, position)
+            
+            total_inflow += inflow
+            total_outflow += outflow
+            total_opening_balance += opening_balance
+            total_closing_balance += closing_balance
+            count += 1
+        
+        # Overall position
+        overall_position = _POSITIONS[(total_closing_balance > 0) - (total_closing_balance < 0) + 1]
+        
+        self.count = count
+        self.totals = (total_inflow, total_outflow, total_opening_balance, total_closing_balance,
+                       overall_position)
 
 
 class ExcelFormatter:
@@ -23,328 +153,724 @@ class ExcelFormatter:
     TOTAL_COLOR = "70AD47"  # Green
     ALTERNATE_COLOR = "F2F2F2"  # Light gray
     
+    # Style prototypes, built once per process
+    HEADER_FONT = Font(name='Arial', size=12, bold=True, color='FFFFFF')
+    HEADER_FILL = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type='solid')
+    SUBHEADER_FONT = Font(name='Arial', size=11, bold=True, color='000000')
+    SUBHEADER_FILL = PatternFill(start_color=SUBHEADER_COLOR, end_color=SUBHEADER_COLOR, fill_type='solid')
+    TOTAL_FONT = Font(name='Arial', size=11, bold=True, color='FFFFFF')
+    TOTAL_FILL = PatternFill(start_color=TOTAL_COLOR, end_color=TOTAL_COLOR, fill_type='solid')
+    DATA_FONT = Font(name='Arial', size=10)
+    CENTER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+    RIGHT_ALIGNMENT = Alignment(horizontal='right', vertical='center')
+    LEFT_ALIGNMENT = Alignment(horizontal='left', vertical='center')
+    THIN_BORDER = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    # Data blocks get their grid and row stripes from one table style, not per-cell borders
+    TABLE_STYLE = "TableStyleMedium9"
+    
     def __init__(self, workbook):
         self.workbook = workbook
         self.setup_styles()
     
     def setup_styles(self):
         """Setup common styles for the workbook"""
-        # Header style
-        self.header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
-        self.header_fill = PatternFill(start_color=self.HEADER_COLOR, end_color=self.HEADER_COLOR, fill_type='solid')
-        self.header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Subheader style
-        self.subheader_font = Font(name='Arial', size=11, bold=True, color='000000')
-        self.subheader_fill = PatternFill(start_color=self.SUBHEADER_COLOR, end_color=self.SUBHEADER_COLOR, fill_type='solid')
-        self.subheader_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Total style
-        self.total_font = Font(name='Arial', size=11, bold=True, color='FFFFFF')
-        self.total_fill = PatternFill(start_color=self.TOTAL_COLOR, end_color=self.TOTAL_COLOR, fill_type='solid')
-        self.total_alignment = Alignment(horizontal='right', vertical='center')
-        
-        # Data style
-        self.data_font = Font(name='Arial', size=10)
-        self.data_alignment = Alignment(horizontal='right', vertical='center')
-        
-        # Border style
-        self.thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        # Style objects are immutable, so every formatter shares the class-level prototypes
+        self.header_font = self.HEADER_FONT
+        self.header_fill = self.HEADER_FILL
+        self.header_alignment = self.CENTER_ALIGNMENT
+        
+        self.subheader_font = self.SUBHEADER_FONT
+        self.subheader_fill = self.SUBHEADER_FILL
+        self.subheader_alignment = self.CENTER_ALIGNMENT
+        
+        self.total_font = self.TOTAL_FONT
+        self.total_fill = self.TOTAL_FILL
+        self.total_alignment = self.RIGHT_ALIGNMENT
+        
+        self.data_font = self.DATA_FONT
+        self.data_alignment = self.RIGHT_ALIGNMENT
+        self.left_data_alignment = self.LEFT_ALIGNMENT
+        
+        self.thin_border = self.THIN_BORDER
+        
+        # Named styles are serialized once per workbook instead of per cell
+        self.header_style = self.register_named_style(
+            'fin_header', font=self.header_font, fill=self.header_fill, alignment=self.header_alignment)
+        self.subheader_style = self.register_named_style(
+            'fin_subheader', font=self.subheader_font, fill=self.subheader_fill, alignment=self.subheader_alignment)
+        self.total_style = self.register_named_style(
+            'fin_total', font=self.total_font, fill=self.total_fill, alignment=self.total_alignment)
+        self.total_currency_style = self.register_named_style(
+            'fin_total_currency', font=self.total_font, fill=self.total_fill, alignment=self.total_alignment,
+            number_format='#,##0.00')
+        self.data_style = self.register_named_style(
+            'fin_data', bordered=False, font=self.data_font, alignment=self.left_data_alignment)
+        self.currency_style = self.register_named_style(
+            'fin_currency', bordered=False, font=self.data_font, alignment=self.data_alignment,
+            number_format='#,##0.00')
     
-    def format_header(self, worksheet, row, start_col, end_col, text):
-        """Format header row"""
-        cell = worksheet.cell(row=row, column=start_col, value=text)
-        worksheet.merge_cells(f"{get_column_letter(start_col)}{row}:{get_column_letter(end_col)}{row}")
-        
-        cell.font = self.header_font
-        cell.fill = self.header_fill
-        cell.alignment = self.header_alignment
-        cell.border = self.thin_border
+    def register_named_style(self, name, bordered=True, **attributes):
+        """Register a named style on the workbook once and return its name"""
+        if name not in self.workbook.named_styles:
+            if bordered:
+                attributes['border'] = self.thin_border
+            self.workbook.add_named_style(NamedStyle(name=name, **attributes))
+        return name
+    
+    # Styled cells are built up front and appended as whole rows (write-only sheets)
+    
+    def header_cell(self, worksheet, text):
+        """Build a header cell for ws.append"""
+        cell = WriteOnlyCell(worksheet, value=text)
+        cell.style = self.header_style
         
         return cell
     
-    def format_subheader(self, worksheet, row, start_col, end_col, text):
-        """Format subheader row"""
-        cell = worksheet.cell(row=row, column=start_col, value=text)
-        worksheet.merge_cells(f"{get_column_letter(start_col)}{row}:{get_column_letter(end_col)}{row}")
-        
-        cell.font = self.subheader_font
-        cell.fill = self.subheader_fill
-        cell.alignment = self.subheader_alignment
-        cell.border = self.thin_border
+    def subheader_cell(self, worksheet, text):
+        """Build a subheader cell for ws.append"""
+        cell = WriteOnlyCell(worksheet, value=text)
+        cell.style = self.subheader_style
         
         return cell
     
-    def format_total_row(self, worksheet, row, start_col, end_col, text):
-        """Format total row"""
-        cell = worksheet.cell(row=row, column=start_col, value=text)
-        worksheet.merge_cells(f"{get_column_letter(start_col)}{row}:{get_column_letter(end_col)}{row}")
-        
-        cell.font = self.total_font
-        cell.fill = self.total_fill
-        cell.alignment = self.total_alignment
-        cell.border = self.thin_border
+    def total_cell(self, worksheet, text):
+        """Build a total label cell for ws.append"""
+        cell = WriteOnlyCell(worksheet, value=text)
+        cell.style = self.total_style
         
         return cell
     
-    def format_data_cell(self, worksheet, row, col, value, is_number=False):
-        """Format data cell"""
-        cell = worksheet.cell(row=row, column=col, value=value)
-        cell.font = self.data_font
-        cell.border = self.thin_border
-        
-        if is_number:
-            cell.alignment = self.data_alignment
-            cell.number_format = '#,##0.00'
-        else:
-            cell.alignment = Alignment(horizontal='left', vertical='center')
+    def total_row(self, worksheet, label, values):
+        """Build an unmerged totals row: label, a blank filler cell, then the totals (floats as currency)"""
+        row = [self.total_cell(worksheet, label), self.total_cell(worksheet, None)]
+        for value in values:
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.style = self.total_currency_style if isinstance(value, float) else self.total_style
+            row.append(cell)
+        
+        return row
+    
+    def data_cell(self, worksheet, value, is_number=False):
+        """Build a data cell for ws.append"""
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.style = self.currency_style if is_number else self.data_style
         
         return cell
     
-    def format_currency_cell(self, worksheet, row, col, value):
-        """Format currency cell with comma separators"""
-        cell = worksheet.cell(row=row, column=col, value=float(value) if value else 0)
-        cell.font = self.data_font
-        cell.alignment = self.data_alignment
-        cell.border = self.thin_border
-        cell.number_format = '#,##0.00'
+    def currency_cell(self, worksheet, value):
+        """Build a currency cell with comma separators for ws.append"""
+        cell = WriteOnlyCell(worksheet, value=float(value) if value else 0)
+        cell.style = self.currency_style
         
         return cell
     
-    def auto_adjust_columns(self, worksheet):
-        """Auto-adjust column widths"""
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+    def merge_row(self, worksheet, row, start_col, end_col):
+        """Merge a row range; works for write-only sheets where merge_cells is unavailable
+        
+        Append only the styled first cell of the range; cells past it are not written.
+        """
+        if start_col != end_col:
+            worksheet.merged_cells.add(CellRange(min_col=start_col, min_row=row, max_col=end_col, max_row=row))
+    
+    def add_data_table(self, worksheet, headers, header_row, last_row):
+        """Style the column headers and data rows below them as one Excel table"""
+        if last_row <= header_row:
+            return None  # Excel rejects tables without data rows
+        
+        table = Table(
+            displayName=re.sub(r'\W', '', worksheet.title),
+            ref=f"A{header_row}:{column_letter(len(headers))}{last_row}",
+        )
+        table.tableStyleInfo = TableStyleInfo(name=self.TABLE_STYLE, showRowStripes=True, showColumnStripes=False)
+        # Write-only sheets cannot read the header row back, so name the columns here
+        table.tableColumns = [TableColumn(id=i, name=header) for i, header in enumerate(headers, 1)]
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='In write-only mode you must add table columns manually')
+            worksheet.add_table(table)
+        
+        return table
+    
+    def set_column_widths(self, worksheet, widths):
+        """Set fixed column widths (must run before the first append in write-only mode)"""
+        for col, width in enumerate(widths, 1):
+            worksheet.column_dimensions[column_letter(col)].width = width
 
 
 class FinancialReportExporter:
     """Main class for exporting financial reports to Excel"""
     
-    def __init__(self):
-        self.workbook = openpyxl.Workbook()
+    # openpyxl always serializes strings as inline strings, so the repeated
+    # position labels and one-off titles never go through a shared strings table
+    
+    # Fixed column widths: write-only sheets cannot be read back to fit them
+    ANALYSIS_COLUMN_WIDTHS = (14, 30, 18, 18, 18, 14, 18, 18)
+    CASH_FLOW_COLUMN_WIDTHS = (14, 30, 18, 18, 18, 18, 24)
+    
+    def __init__(self, write_only=True):
+        self.workbook = openpyxl.Workbook(write_only=write_only)
+        if not write_only:
+            # Keep both modes consistent: reports add their own sheets
+            self.workbook.remove(self.workbook.active)
         self.formatter = ExcelFormatter(self.workbook)
     
-    def create_cost_center_analysis_report(self, cost_centers_data, period_start=None, period_end=None):
-        """Create Cost Center Analysis Report"""
-        worksheet = self.workbook.active
-        worksheet.title = "Cost Center Analysis"
+    def create_cost_center_analysis_report(self, cost_centers_data, period_start=None, period_end=None, worksheet=None):
+        """Create Cost Center Analysis Report on worksheet (a new sheet by default)"""
+        if worksheet is None:
+            worksheet = self.workbook.create_sheet(title="Cost Center Analysis")
+        formatter = self.formatter
+        formatter.set_column_widths(worksheet, self.ANALYSIS_COLUMN_WIDTHS)
         
         # Report header
         current_row = 1
-        self.formatter.format_header(worksheet, current_row, 1, 8, 
-                                   "تقرير تحليل مراكز التكلفة - Cost Center Analysis Report")
+        worksheet.append([formatter.header_cell(worksheet, ANALYSIS_TITLE)])
+        formatter.merge_row(worksheet, current_row, 1, 8)
+        worksheet.append([])
         current_row += 2
         
         # Period information
         if period_start and period_end:
             period_text = f"الفترة من {period_start} إلى {period_end} - Period: {period_start} to {period_end}"
-            self.formatter.format_subheader(worksheet, current_row, 1, 8, period_text)
+            worksheet.append([formatter.subheader_cell(worksheet, period_text)])
+            formatter.merge_row(worksheet, current_row, 1, 8)
+            worksheet.append([])
             current_row += 2
         
         # Column headers
-        headers = [
-            "رمز المركز", "اسم المركز", "إجمالي المصروفات", "رواتب المدرسين",
-            "مصروفات أخرى", "عدد الدورات", "إجمالي الإيرادات", "الربح/الخسارة"
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            self.formatter.format_subheader(worksheet, current_row, col, col, header)
+        worksheet.append([formatter.subheader_cell(worksheet, header) for header in ANALYSIS_HEADERS])
+        header_row = current_row
         current_row += 1
         
         # Data rows
-        total_expenses = Decimal('0')
-        total_teacher_salaries = Decimal('0')
-        total_other_expenses = Decimal('0')
-        total_revenue = Decimal('0')
-        total_profit_loss = Decimal('0')
-        
-        for cost_center_data in cost_centers_data:
-            # Cost center code and name
-            self.formatter.format_data_cell(worksheet, current_row, 1, cost_center_data['code'])
-            self.formatter.format_data_cell(worksheet, current_row, 2, cost_center_data['name'])
-            
-            # Financial data
-            expenses = cost_center_data.get('total_expenses', Decimal('0'))
-            teacher_salaries = cost_center_data.get('teacher_salaries', Decimal('0'))
-            other_expenses = cost_center_data.get('other_expenses', Decimal('0'))
-            revenue = cost_center_data.get('total_revenue', Decimal('0'))
-            profit_loss = revenue - expenses
-            
-            self.formatter.format_currency_cell(worksheet, current_row, 3, expenses)
-            self.formatter.format_currency_cell(worksheet, current_row, 4, teacher_salaries)
-            self.formatter.format_currency_cell(worksheet, current_row, 5, other_expenses)
-            self.formatter.format_currency_cell(worksheet, current_row, 6, cost_center_data.get('course_count', 0))
-            self.formatter.format_currency_cell(worksheet, current_row, 7, revenue)
-            self.formatter.format_currency_cell(worksheet, current_row, 8, profit_loss)
-            
-            # Update totals
-            total_expenses += expenses
-            total_teacher_salaries += teacher_salaries
-            total_other_expenses += other_expenses
-            total_revenue += revenue
-            total_profit_loss += profit_loss
-            
-            current_row += 1
+        rows = AnalysisRows(cost_centers_data)
+        for code, name, *amounts in rows:
+            worksheet.append([
+                formatter.data_cell(worksheet, code),
+                formatter.data_cell(worksheet, name),
+                *(formatter.currency_cell(worksheet, amount) for amount in amounts),
+            ])
+        current_row += rows.count
+        
+        formatter.add_data_table(worksheet, ANALYSIS_HEADERS, header_row, current_row - 1)
         
         # Total row
+        worksheet.append([])
         current_row += 1
-        self.formatter.format_total_row(worksheet, current_row, 1, 2, "المجموع الكلي - Total")
-        self.formatter.format_currency_cell(worksheet, current_row, 3, total_expenses)
-        self.formatter.format_currency_cell(worksheet, current_row, 4, total_teacher_salaries)
-        self.formatter.format_currency_cell(worksheet, current_row, 5, total_other_expenses)
-        self.formatter.format_data_cell(worksheet, current_row, 6, sum(cc.get('course_count', 0) for cc in cost_centers_data))
-        self.formatter.format_currency_cell(worksheet, current_row, 7, total_revenue)
-        self.formatter.format_currency_cell(worksheet, current_row, 8, total_profit_loss)
-        
-        # Auto-adjust columns
-        self.formatter.auto_adjust_columns(worksheet)
+        worksheet.append(formatter.total_row(worksheet, TOTAL_LABEL, rows.totals))
         
         return self.workbook
     
-    def create_cost_center_cash_flow_report(self, cash_flow_data, period_start=None, period_end=None):
-        """Create Cost Center Cash Flow Report"""
-        worksheet = self.workbook.active
-        worksheet.title = "Cost Center Cash Flow"
+    def create_cost_center_cash_flow_report(self, cash_flow_data, period_start=None, period_end=None, worksheet=None):
+        """Create Cost Center Cash Flow Report on worksheet (a new sheet by default)"""
+        if worksheet is None:
+            worksheet = self.workbook.create_sheet(title="Cost Center Cash Flow")
+        formatter = self.formatter
+        formatter.set_column_widths(worksheet, self.CASH_FLOW_COLUMN_WIDTHS)
         
         # Report header
         current_row = 1
-        self.formatter.format_header(worksheet, current_row, 1, 7, 
-                                   "تقرير التدفق النقدي لمراكز التكلفة - Cost Center Cash Flow Report")
+        worksheet.append([formatter.header_cell(worksheet, CASH_FLOW_TITLE)])
+        formatter.merge_row(worksheet, current_row, 1, 7)
+        worksheet.append([])
         current_row += 2
         
         # Period information
         if period_start and period_end:
             period_text = f"الفترة من {period_start} إلى {period_end} - Period: {period_start} to {period_end}"
-            self.formatter.format_subheader(worksheet, current_row, 1, 7, period_text)
+            worksheet.append([formatter.subheader_cell(worksheet, period_text)])
+            formatter.merge_row(worksheet, current_row, 1, 7)
+            worksheet.append([])
             current_row += 2
         
         # Column headers
-        headers = [
-            "رمز المركز", "اسم المركز", "التدفق الداخل", "التدفق الخارج",
-            "الرصيد الافتتاحي", "الرصيد الختامي", "الوضع المالي"
-        ]
+        worksheet.append([formatter.subheader_cell(worksheet, header) for header in CASH_FLOW_HEADERS])
+        header_row = current_row
+        current_row += 1
+        
+        # Data rows
+        rows = CashFlowRows(cash_flow_data)
+        for code, name, *amounts, position in rows:
+            worksheet.append([
+                formatter.data_cell(worksheet, code),
+                formatter.data_cell(worksheet, name),
+                *(formatter.currency_cell(worksheet, amount) for amount in amounts),
+                formatter.data_cell(worksheet, position),
+            ])
+        current_row += rows.count
+        
+        formatter.add_data_table(worksheet, CASH_FLOW_HEADERS, header_row, current_row - 1)
         
-        for col, header in enumerate(headers, 1):
-            self.formatter.format_subheader(worksheet, current_row, col, col, header)
+        # Total row
+        worksheet.append([])
         current_row += 1
+        worksheet.append(formatter.total_row(worksheet, TOTAL_LABEL, rows.totals))
+        
+        return self.workbook
+    
+    def create_comprehensive_financial_report(self, analysis_data, cash_flow_data, period_start=None, period_end=None):
+        """Create comprehensive financial report with multiple sheets"""
+        analysis_sheet = self.workbook.create_sheet("Cost Center Analysis")
+        cash_flow_sheet = self.workbook.create_sheet("Cash Flow Analysis")
+        
+        # Generate both reports into their own sheets
+        self.create_cost_center_analysis_report(analysis_data, period_start, period_end, worksheet=analysis_sheet)
+        self.create_cost_center_cash_flow_report(cash_flow_data, period_start, period_end, worksheet=cash_flow_sheet)
+        
+        return self.workbook
+
+
+class FinancialReportExporterXlsx:
+    """XlsxWriter-backed exporter for large reports, mirroring FinancialReportExporter
+    
+    Uses constant_memory mode, which flushes each row to disk as soon as the
+    next one starts, so rows must be written strictly top to bottom. In this
+    mode strings (titles, position labels) are written inline as well, so no
+    shared strings table is built.
+    """
+    
+    def __init__(self):
+        import xlsxwriter
+        
+        self.output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.workbook = xlsxwriter.Workbook(self.output, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        self.setup_formats()
+    
+    def setup_formats(self):
+        """Create each cell format once per workbook"""
+        border = {'border': 1, 'valign': 'vcenter', 'font_name': 'Arial'}
+        self.header_fmt = self.workbook.add_format({
+            **border, 'bold': True, 'font_size': 12, 'font_color': '#FFFFFF',
+            'bg_color': f"#{ExcelFormatter.HEADER_COLOR}", 'align': 'center',
+        })
+        self.subheader_fmt = self.workbook.add_format({
+            **border, 'bold': True, 'font_size': 11, 'font_color': '#000000',
+            'bg_color': f"#{ExcelFormatter.SUBHEADER_COLOR}", 'align': 'center',
+        })
+        self.total_fmt = self.workbook.add_format({
+            **border, 'bold': True, 'font_size': 11, 'font_color': '#FFFFFF',
+            'bg_color': f"#{ExcelFormatter.TOTAL_COLOR}", 'align': 'right',
+        })
+        self.total_currency_fmt = self.workbook.add_format({
+            **border, 'bold': True, 'font_size': 11, 'font_color': '#FFFFFF',
+            'bg_color': f"#{ExcelFormatter.TOTAL_COLOR}", 'align': 'right', 'num_format': '#,##0.00',
+        })
+        self.data_fmt = self.workbook.add_format({**border, 'font_size': 10, 'align': 'left'})
+        self.currency_fmt = self.workbook.add_format({
+            **border, 'font_size': 10, 'align': 'right', 'num_format': '#,##0.00',
+        })
+    
+    def _write_title(self, worksheet, title, headers, widths, period_start, period_end):
+        """Write title, period and column header rows; return the next row index"""
+        for col, width in enumerate(widths):
+            worksheet.set_column(col, col, width)
+        
+        last_col = len(headers) - 1
+        worksheet.merge_range(0, 0, 0, last_col, title, self.header_fmt)
+        current_row = 2
+        
+        if period_start and period_end:
+            period_text = f"الفترة من {period_start} إلى {period_end} - Period: {period_start} to {period_end}"
+            worksheet.merge_range(current_row, 0, current_row, last_col, period_text, self.subheader_fmt)
+            current_row += 2
+        
+        worksheet.write_row(current_row, 0, headers, self.subheader_fmt)
+        return current_row + 1
+    
+    def create_cost_center_analysis_report(self, cost_centers_data, period_start=None, period_end=None,
+                                           sheet_name="Cost Center Analysis"):
+        """Create Cost Center Analysis Report"""
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        current_row = self._write_title(worksheet, ANALYSIS_TITLE, ANALYSIS_HEADERS,
+                                        FinancialReportExporter.ANALYSIS_COLUMN_WIDTHS,
+                                        period_start, period_end)
         
         # Data rows
-        total_inflow = Decimal('0')
-        total_outflow = Decimal('0')
-        total_opening_balance = Decimal('0')
-        total_closing_balance = Decimal('0')
-        
-        for cash_flow_item in cash_flow_data:
-            # Cost center code and name
-            self.formatter.format_data_cell(worksheet, current_row, 1, cash_flow_item['code'])
-            self.formatter.format_data_cell(worksheet, current_row, 2, cash_flow_item['name'])
-            
-            # Cash flow data
-            inflow = cash_flow_item.get('inflow', Decimal('0'))
-            outflow = cash_flow_item.get('outflow', Decimal('0'))
-            opening_balance = cash_flow_item.get('opening_balance', Decimal('0'))
-            closing_balance = opening_balance + inflow - outflow
-            
-            # Determine financial position
-            if closing_balance > 0:
-                position = "رصيد موجب - Positive"
-            elif closing_balance < 0:
-                position = "رصيد سالب - Negative"
-            else:
-                position = "متوازن - Balanced"
-            
-            self.formatter.format_currency_cell(worksheet, current_row, 3, inflow)
-            self.formatter.format_currency_cell(worksheet, current_row, 4, outflow)
-            self.formatter.format_currency_cell(worksheet, current_row, 5, opening_balance)
-            self.formatter.format_currency_cell(worksheet, current_row, 6, closing_balance)
-            self.formatter.format_data_cell(worksheet, current_row, 7, position)
-            
-            # Update totals
-            total_inflow += inflow
-            total_outflow += outflow
-            total_opening_balance += opening_balance
-            total_closing_balance += closing_balance
-            
+        rows = AnalysisRows(cost_centers_data)
+        for row in rows:
+            worksheet.write_row(current_row, 0, row[:2], self.data_fmt)
+            worksheet.write_row(current_row, 2, row[2:], self.currency_fmt)
             current_row += 1
         
         # Total row
+        total_expenses, total_teacher_salaries, total_other_expenses, total_courses, total_revenue, total_profit_loss = rows.totals
         current_row += 1
-        self.formatter.format_total_row(worksheet, current_row, 1, 2, "المجموع الكلي - Total")
-        self.formatter.format_currency_cell(worksheet, current_row, 3, total_inflow)
-        self.formatter.format_currency_cell(worksheet, current_row, 4, total_outflow)
-        self.formatter.format_currency_cell(worksheet, current_row, 5, total_opening_balance)
-        self.formatter.format_currency_cell(worksheet, current_row, 6, total_closing_balance)
+        worksheet.write_row(current_row, 0, (TOTAL_LABEL, ''), self.total_fmt)
+        worksheet.write_row(current_row, 2, (
+            total_expenses, total_teacher_salaries, total_other_expenses
+        ), self.total_currency_fmt)
+        worksheet.write(current_row, 5, total_courses, self.total_fmt)
+        worksheet.write_row(current_row, 6, (total_revenue, total_profit_loss), self.total_currency_fmt)
         
-        # Overall position
-        if total_closing_balance > 0:
-            overall_position = "رصيد موجب - Positive"
-        elif total_closing_balance < 0:
-            overall_position = "رصيد سالب - Negative"
-        else:
-            overall_position = "متوازن - Balanced"
-        self.formatter.format_data_cell(worksheet, current_row, 7, overall_position)
+        return self.workbook
+    
+    def create_cost_center_cash_flow_report(self, cash_flow_data, period_start=None, period_end=None,
+                                            sheet_name="Cost Center Cash Flow"):
+        """Create Cost Center Cash Flow Report"""
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        current_row = self._write_title(worksheet, CASH_FLOW_TITLE, CASH_FLOW_HEADERS,
+                                        FinancialReportExporter.CASH_FLOW_COLUMN_WIDTHS,
+                                        period_start, period_end)
+        
+        # Data rows
+        rows = CashFlowRows(cash_flow_data)
+        for row in rows:
+            worksheet.write_row(current_row, 0, row[:2], self.data_fmt)
+            worksheet.write_row(current_row, 2, row[2:6], self.currency_fmt)
+            worksheet.write_string(current_row, 6, row[6], self.data_fmt)
+            current_row += 1
         
-        # Auto-adjust columns
-        self.formatter.auto_adjust_columns(worksheet)
+        # Total row
+        current_row += 1
+        worksheet.write_row(current_row, 0, (TOTAL_LABEL, ''), self.total_fmt)
+        worksheet.write_row(current_row, 2, rows.totals[:4], self.total_currency_fmt)
+        worksheet.write_string(current_row, 6, rows.totals[4], self.total_fmt)
         
         return self.workbook
     
     def create_comprehensive_financial_report(self, analysis_data, cash_flow_data, period_start=None, period_end=None):
         """Create comprehensive financial report with multiple sheets"""
-        # Remove default sheet
-        self.workbook.remove(self.workbook.active)
+        self.create_cost_center_analysis_report(analysis_data, period_start, period_end)
+        self.create_cost_center_cash_flow_report(cash_flow_data, period_start, period_end,
+                                                 sheet_name="Cash Flow Analysis")
         
-        # Create Cost Center Analysis sheet
-        analysis_sheet = self.workbook.create_sheet("Cost Center Analysis")
-        self.formatter = ExcelFormatter(self.workbook)
+        return self.workbook
+
+
+class XmlSheet:
+    """One sheet part, streamed into the package as rows are appended
+    
+    Only the merge ranges are kept until the sheet is closed, since they
+    follow <sheetData> in the part.
+    """
+    
+    def __init__(self, part, title, widths):
+        self.part = part
+        self.title = title
+        self.merges = []
+        self.max_row = 0
+        head = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{XmlWorkbook.MAIN_NS}">'
+        if widths:
+            head += '<cols>' + ''.join(
+                f'<col min="{col}" max="{col}" width="{width}" customWidth="1"/>'
+                for col, width in enumerate(widths, 1)
+            ) + '</cols>'
+        part.write(f'{head}<sheetData>'.encode())
+    
+    def append(self, cells):
+        """Append a row of (value, style id) pairs; None entries are left empty"""
+        self.max_row += 1
+        r = self.max_row
+        parts = []
+        for col, cell in enumerate(cells, 1):
+            if cell is None:
+                continue
+            value, style = cell
+            ref = f"{column_letter(col)}{r}"
+            if value is None or value == '':
+                parts.append(f'<c r="{ref}" s="{style}"/>')
+            elif isinstance(value, str):
+                # Control characters (e.g. pasted into descriptions) are not allowed in XML 1.0
+                value = ILLEGAL_CHARACTERS_RE.sub('', value)
+                space = ' xml:space="preserve"' if value != value.strip() else ''
+                parts.append(f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>')
+            elif isinstance(value, bool):
+                # Checked before numbers: bool is an int subclass
+                parts.append(f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>')
+            elif isinstance(value, (int, float, Decimal)):
+                # str() keeps Decimal amounts numeric (their repr is not)
+                parts.append(f'<c r="{ref}" s="{style}"><v>{value}</v></c>')
+            elif isinstance(value, (datetime.date, datetime.time)):
+                # No date styles in STYLES_XML, so dates are written as ISO text
+                parts.append(f'<c r="{ref}" s="{style}" t="inlineStr"><is><t>{value.isoformat()}</t></is></c>')
+            else:
+                raise TypeError(f"Cannot write {type(value).__name__} value to cell {ref}")
+        if parts:
+            self.part.write(f'<row r="{r}">{"".join(parts)}</row>'.encode())
+    
+    def merge_row(self, row, start_col, end_col):
+        """Merge a range of columns on one row"""
+        self.merges.append(f"{column_letter(start_col)}{row}:{column_letter(end_col)}{row}")
+    
+    def close(self):
+        """Write the merge ranges and finish the part"""
+        tail = '</sheetData>'
+        if self.merges:
+            tail += f'<mergeCells count="{len(self.merges)}">' + ''.join(
+                f'<mergeCell ref="{ref}"/>' for ref in self.merges
+            ) + '</mergeCells>'
+        self.part.write(f'{tail}</worksheet>'.encode())
+        self.part.close()
+
+
+class XmlWorkbook:
+    """Minimal xlsx writer: inline strings, a fixed style table and no formulas
+    
+    Skips openpyxl's cell objects entirely; each row is rendered to XML once
+    and deflated straight into its sheet part, so memory stays flat however
+    many rows a sheet has. Sheets are written one at a time: creating a sheet
+    finishes the previous one. The workbook parts are added on close().
+    compresslevel=1 keeps the deflate pass cheap, which dominates export time
+    for large reports.
+    """
+    
+    # Indexes into the cellXfs table in STYLES_XML
+    HEADER = 1
+    SUBHEADER = 2
+    TOTAL = 3
+    TOTAL_CURRENCY = 4
+    DATA = 5
+    CURRENCY = 6
+    
+    MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    
+    STYLES_XML = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<styleSheet xmlns="{MAIN_NS}">'
+        '<fonts count="4">'
+        '<font><sz val="10"/><name val="Arial"/></font>'
+        '<font><b/><sz val="12"/><color rgb="FFFFFFFF"/><name val="Arial"/></font>'
+        '<font><b/><sz val="11"/><color rgb="FF000000"/><name val="Arial"/></font>'
+        '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Arial"/></font>'
+        '</fonts>'
+        '<fills count="5">'
+        '<fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill>'
+        f'<fill><patternFill patternType="solid"><fgColor rgb="FF{ExcelFormatter.HEADER_COLOR}"/></patternFill></fill>'
+        f'<fill><patternFill patternType="solid"><fgColor rgb="FF{ExcelFormatter.SUBHEADER_COLOR}"/></patternFill></fill>'
+        f'<fill><patternFill patternType="solid"><fgColor rgb="FF{ExcelFormatter.TOTAL_COLOR}"/></patternFill></fill>'
+        '</fills>'
+        '<borders count="2">'
+        '<border><left/><right/><top/><bottom/><diagonal/></border>'
+        '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+        '</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="7">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="center" vertical="center"/></xf>'
+        '<xf numFmtId="0" fontId="2" fillId="3" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="center" vertical="center"/></xf>'
+        '<xf numFmtId="0" fontId="3" fillId="4" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="right" vertical="center"/></xf>'
+        '<xf numFmtId="4" fontId="3" fillId="4" borderId="1" xfId="0" applyNumberFormat="1" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="right" vertical="center"/></xf>'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="left" vertical="center"/></xf>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="1" xfId="0" applyNumberFormat="1" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="right" vertical="center"/></xf>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+    
+    def __init__(self, file=None, compresslevel=1):
+        # Like the XlsxWriter exporter, write into a spooled temporary file by default
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) if file is None else file
+        self.package = zipfile.ZipFile(self.file, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self.sheets = []
+    
+    def create_sheet(self, title, widths=()):
+        """Finish the current sheet, then add an empty sheet and return it"""
+        if self.sheets:
+            self.sheets[-1].close()
+        part = self.package.open(f'xl/worksheets/sheet{len(self.sheets) + 1}.xml', 'w')
+        sheet = XmlSheet(part, title, widths)
+        self.sheets.append(sheet)
+        return sheet
+    
+    def close(self):
+        """Finish the last sheet and write the workbook parts; the package is then complete in self.file"""
+        if self.sheets:
+            self.sheets[-1].close()
+        sheet_count = len(self.sheets)
+        package = self.package
+        package.writestr('[Content_Types].xml', self._content_types(sheet_count))
+        package.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ))
+        package.writestr('xl/workbook.xml', self._workbook_xml())
+        package.writestr('xl/_rels/workbook.xml.rels', self._workbook_rels(sheet_count))
+        package.writestr('xl/styles.xml', self.STYLES_XML)
+        package.close()
+    
+    def _content_types(self, sheet_count):
+        sheets = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, sheet_count + 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheets}</Types>'
+        )
+    
+    def _workbook_xml(self):
+        sheets = ''.join(
+            f'<sheet name={quoteattr(sheet.title)} sheetId="{i}" r:id="rId{i}"/>'
+            for i, sheet in enumerate(self.sheets, 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{self.MAIN_NS}" xmlns:r="{self.REL_NS}"><sheets>{sheets}</sheets></workbook>'
+        )
+    
+    def _workbook_rels(self, sheet_count):
+        sheets = ''.join(
+            f'<Relationship Id="rId{i}" Type="{self.REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, sheet_count + 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{sheets}<Relationship Id="rId{sheet_count + 1}" Type="{self.REL_NS}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        )
+
+
+class FinancialReportExporterXml:
+    """Opt-in exporter that writes the report XML directly, for very large cost center lists
+    
+    Produces the same layout as FinancialReportExporter without building
+    openpyxl cells; see XmlWorkbook for what the package contains.
+    """
+    
+    def __init__(self, compresslevel=1):
+        self.workbook = XmlWorkbook(compresslevel=compresslevel)
+    
+    def write_title(self, sheet, title, headers, period_start, period_end):
+        """Write title, period and column header rows"""
+        last_col = len(headers)
+        sheet.append([(title, XmlWorkbook.HEADER)])
+        sheet.merge_row(sheet.max_row, 1, last_col)
+        sheet.append([])
         
-        # Create Cash Flow sheet
-        cash_flow_sheet = self.workbook.create_sheet("Cash Flow Analysis")
+        if period_start and period_end:
+            period_text = f"الفترة من {period_start} إلى {period_end} - Period: {period_start} to {period_end}"
+            sheet.append([(period_text, XmlWorkbook.SUBHEADER)])
+            sheet.merge_row(sheet.max_row, 1, last_col)
+            sheet.append([])
         
-        # Generate both reports
+        sheet.append([(header, XmlWorkbook.SUBHEADER) for header in headers])
+    
+    def create_cost_center_analysis_report(self, cost_centers_data, period_start=None, period_end=None,
+                                           sheet_name="Cost Center Analysis"):
+        """Create Cost Center Analysis Report"""
+        sheet = self.workbook.create_sheet(sheet_name, FinancialReportExporter.ANALYSIS_COLUMN_WIDTHS)
+        self.write_title(sheet, ANALYSIS_TITLE, ANALYSIS_HEADERS, period_start, period_end)
+        data, currency = XmlWorkbook.DATA, XmlWorkbook.CURRENCY
+        
+        # Data rows
+        rows = AnalysisRows(cost_centers_data)
+        for code, name, *amounts in rows:
+            sheet.append([(code, data), (name, data), *((amount, currency) for amount in amounts)])
+        
+        # Total row
+        total_expenses, total_teacher_salaries, total_other_expenses, total_courses, total_revenue, total_profit_loss = rows.totals
+        total, total_currency = XmlWorkbook.TOTAL, XmlWorkbook.TOTAL_CURRENCY
+        sheet.append([])
+        sheet.append([
+            (TOTAL_LABEL, total), (None, total),
+            (total_expenses, total_currency), (total_teacher_salaries, total_currency),
+            (total_other_expenses, total_currency), (total_courses, total),
+            (total_revenue, total_currency), (total_profit_loss, total_currency),
+        ])
+        
+        return self.workbook
+    
+    def create_cost_center_cash_flow_report(self, cash_flow_data, period_start=None, period_end=None,
+                                            sheet_name="Cost Center Cash Flow"):
+        """Create Cost Center Cash Flow Report"""
+        sheet = self.workbook.create_sheet(sheet_name, FinancialReportExporter.CASH_FLOW_COLUMN_WIDTHS)
+        self.write_title(sheet, CASH_FLOW_TITLE, CASH_FLOW_HEADERS, period_start, period_end)
+        data, currency = XmlWorkbook.DATA, XmlWorkbook.CURRENCY
+        
+        # Data rows
+        rows = CashFlowRows(cash_flow_data)
+        for code, name, *amounts, position in rows:
+            sheet.append([
+                (code, data), (name, data), *((amount, currency) for amount in amounts), (position, data),
+            ])
+        
+        # Total row
+        total, total_currency = XmlWorkbook.TOTAL, XmlWorkbook.TOTAL_CURRENCY
+        sheet.append([])
+        sheet.append([
+            (TOTAL_LABEL, total), (None, total),
+            *((amount, total_currency) for amount in rows.totals[:4]),
+            (rows.totals[4], total),
+        ])
+        
+        return self.workbook
+    
+    def create_comprehensive_financial_report(self, analysis_data, cash_flow_data, period_start=None, period_end=None):
+        """Create comprehensive financial report with multiple sheets"""
         self.create_cost_center_analysis_report(analysis_data, period_start, period_end)
-        self.create_cost_center_cash_flow_report(cash_flow_data, period_start, period_end)
+        self.create_cost_center_cash_flow_report(cash_flow_data, period_start, period_end,
+                                                 sheet_name="Cash Flow Analysis")
         
         return self.workbook
 
 
-def format_number_with_commas(value):
-    """Format number with comma separators"""
-    if value is None:
-        return "0.00"
+def save_workbook(workbook, file, compresslevel=EXPORT_COMPRESSLEVEL):
+    """Save an openpyxl workbook like Workbook.save, with a configurable deflate level
     
-    try:
-        # Convert to float first, then format
-        float_value = float(value)
-        return f"{float_value:,.2f}"
-    except (ValueError, TypeError):
-        return "0.00"
+    Mirrors openpyxl.writer.excel.save_workbook, which takes no compresslevel;
+    requirements.txt pins openpyxl below 3.2 because ExcelWriter is internal.
+    """
+    if workbook.write_only and not workbook.worksheets:
+        workbook.create_sheet()
+    archive = zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel)
+    workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    ExcelWriter(workbook, archive).save()
 
 
 def create_excel_response(workbook, filename):
-    """Create HTTP response for Excel file download"""
-    response = HttpResponse(
+    """Create a streaming file response for an Excel download
+    
+    The workbook is serialized to a spooled temporary file (in memory up to
+    SPOOL_MAX_SIZE, then on disk), and FileResponse streams it in blocks and
+    closes it.
+    """
+    if isinstance(workbook, openpyxl.Workbook):
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        save_workbook(workbook, output)
+    elif isinstance(workbook, XmlWorkbook):
+        # Rows were already streamed into the package file as they were appended
+        workbook.close()
+        output = workbook.file
+    else:
+        # XlsxWriter workbooks write into the file they were created with
+        workbook.close()
+        output = workbook.filename
+    output.seek(0)
+    
+    response = FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.block_size = 64 * 1024
     
-    workbook.save(response)
     return response
 
 
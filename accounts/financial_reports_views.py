@@ -6,46 +6,237 @@ Comprehensive financial reporting system with Excel export capabilities
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.contrib import messages
-from django.db.models import Sum, Q, Count
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum, Q, Count, F, Case, When, Value, OuterRef, Subquery, DecimalField, IntegerField
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
-from django.core.paginator import Paginator
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views.generic import View
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
-import json
+import orjson
 
 from .models import (
-    CostCenter, Transaction, JournalEntry, Account, 
-    Studentenrollment, ExpenseEntry, TeacherAdvance, EmployeeAdvance
+    Account, CostCenter, Transaction, Course, CourseTeacherAssignment, Studentenrollment,
+    ASSIGNMENT_SALARY, DASHBOARD_CACHE_VERSION_KEY, DISPLAY_NAME
 )
-from .excel_utils import FinancialReportExporter, create_excel_response, format_number_with_commas
-from employ.models import Teacher, Employee
-from students.models import Student
+from employ.models import Teacher
 
 
-class FinancialReportsMixin:
-    """Mixin for common financial report functionality"""
+MONEY_FIELD = DecimalField(max_digits=15, decimal_places=2)
+
+
+def period_filter(field, start_date=None, end_date=None):
+    """Q object limiting a date field to the optional report period"""
+    q = Q()
+    if start_date:
+        q &= Q(**{f'{field}__gte': start_date})
+    if end_date:
+        q &= Q(**{f'{field}__lte': end_date})
+    return q
+
+
+def per_cost_center(queryset, cost_center_field, aggregate, output_field=MONEY_FIELD):
+    """Correlated subquery computing one aggregate per outer cost center row (0 when empty)"""
+    subquery = queryset.filter(**{cost_center_field: OuterRef('pk')}).order_by().values(
+        cost_center_field
+    ).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def annotate_analysis(queryset, start_date=None, end_date=None):
+    """Annotate cost centers with the analysis figures of the CostCenter get_* methods
     
-    def get_date_range(self, request):
-        """Extract date range from request parameters"""
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        
-        if start_date:
-            try:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            except ValueError:
-                start_date = None
-        
-        if end_date:
-            try:
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            except ValueError:
-                end_date = None
+    Adds total_expenses, teacher_salaries, total_revenue and course_count in
+    the same SELECT, instead of several queries per cost center.
+    """
+    transactions = Transaction.objects.filter(is_debit=True).filter(
+        period_filter('journal_entry__date', start_date, end_date))
+    assignments = CourseTeacherAssignment.objects.filter(is_active=True, course__is_active=True).filter(
+        period_filter('start_date', start_date, end_date))
+    enrollments = Studentenrollment.objects.filter(course__is_active=True).filter(
+        period_filter('enrollment_date', start_date, end_date))
+    courses = Course.objects.filter(is_active=True)
+    
+    return queryset.annotate(
+        total_expenses=per_cost_center(transactions, 'cost_center', Sum('amount')),
+        teacher_salaries=per_cost_center(assignments, 'course__cost_center', Sum(ASSIGNMENT_SALARY)),
+        total_revenue=per_cost_center(enrollments, 'course__cost_center', Sum('total_amount')),
+        course_count=per_cost_center(courses, 'cost_center', Count('pk'), output_field=IntegerField()),
+    )
+
+
+# Cost center columns read by the report rows, fetched as plain dicts
+ROW_FIELDS = ('id', 'code', 'display_name', 'cost_center_type')
+ANALYSIS_FIELDS = ('monthly_budget', 'total_expenses', 'teacher_salaries', 'total_revenue', 'course_count')
+CASH_FLOW_FIELDS = ('inflow', 'outflow', 'opening_balance')
+
+COST_CENTER_TYPES = dict(CostCenter.COST_CENTER_TYPE_CHOICES)
+
+
+def cost_center_type_display(value):
+    """Label for a cost_center_type value, as get_cost_center_type_display returns"""
+    return COST_CENTER_TYPES.get(value, value)
+
+
+def get_analysis_rows(start_date=None, end_date=None):
+    """Yield cost center analysis rows for the report page and its Excel exports"""
+    cost_centers = annotate_analysis(
+        CostCenter.objects.filter(is_active=True).annotate(display_name=DISPLAY_NAME).order_by('code'),
+        start_date, end_date)
+    
+    for cost_center in cost_centers.values(*ROW_FIELDS, *ANALYSIS_FIELDS).iterator(chunk_size=500):
+        total_expenses = cost_center['total_expenses']
+        total_revenue = cost_center['total_revenue']
+        monthly_budget = cost_center['monthly_budget']
+        yield {
+            'id': cost_center['id'],
+            'code': cost_center['code'],
+            'name': cost_center['display_name'],
+            'type': cost_center_type_display(cost_center['cost_center_type']),
+            'total_expenses': total_expenses,
+            'teacher_salaries': cost_center['teacher_salaries'],
+            'other_expenses': total_expenses - cost_center['teacher_salaries'],
+            'total_revenue': total_revenue,
+            'course_count': cost_center['course_count'],
+            'profit_loss': total_revenue - total_expenses,
+            'budget_variance': monthly_budget - total_expenses if monthly_budget else Decimal('0'),
+        }
+
+
+def get_analysis_totals(start_date=None, end_date=None):
+    """Grand totals of the cost center analysis rows, aggregated in one query"""
+    # Aggregate aliases must differ from the annotation names they sum
+    sums = annotate_analysis(CostCenter.objects.filter(is_active=True), start_date, end_date).aggregate(
+        expenses_sum=Sum('total_expenses'),
+        teacher_salaries_sum=Sum('teacher_salaries'),
+        revenue_sum=Sum('total_revenue'),
+        course_count_sum=Sum('course_count'),
+    )
+    total_expenses = sums['expenses_sum'] or Decimal('0')
+    total_teacher_salaries = sums['teacher_salaries_sum'] or Decimal('0')
+    total_revenue = sums['revenue_sum'] or Decimal('0')
+    return {
+        'total_expenses': total_expenses,
+        'total_teacher_salaries': total_teacher_salaries,
+        'total_other_expenses': total_expenses - total_teacher_salaries,
+        'total_revenue': total_revenue,
+        'total_profit_loss': total_revenue - total_expenses,
+        'total_courses': sums['course_count_sum'] or 0,
+    }
+
+
+# Signed transaction amount: debits add, credits subtract
+SIGNED_AMOUNT = Case(
+    When(is_debit=True, then=F('amount')),
+    default=-F('amount'),
+    output_field=MONEY_FIELD,
+)
+
+
+def annotate_cash_flow(queryset, start_date=None, end_date=None):
+    """Annotate cost centers with inflow, outflow and opening_balance in one query"""
+    cash = Transaction.objects.filter(account_id__in=Account.cash_account_ids()).filter(
+        period_filter('journal_entry__date', start_date, end_date))
+    if start_date:
+        opening_balance = per_cost_center(
+            Transaction.objects.filter(journal_entry__date__lt=start_date), 'cost_center', Sum(SIGNED_AMOUNT))
+    else:
+        opening_balance = Value(Decimal('0.00'), output_field=MONEY_FIELD)
+    
+    return queryset.annotate(
+        inflow=per_cost_center(cash.filter(is_debit=True), 'cost_center', Sum('amount')),
+        outflow=per_cost_center(cash.filter(is_debit=False), 'cost_center', Sum('amount')),
+        opening_balance=opening_balance,
+    )
+
+
+def get_cash_flow_rows(start_date=None, end_date=None):
+    """Yield cost center cash flow rows for the report page and its Excel exports"""
+    cost_centers = annotate_cash_flow(
+        CostCenter.objects.filter(is_active=True).annotate(display_name=DISPLAY_NAME).order_by('code'),
+        start_date, end_date)
+    
+    for cost_center in cost_centers.values(*ROW_FIELDS, *CASH_FLOW_FIELDS).iterator(chunk_size=500):
+        inflow = cost_center['inflow']
+        outflow = cost_center['outflow']
+        opening_balance = cost_center['opening_balance']
+        net_cash_flow = inflow - outflow
+        yield {
+            'id': cost_center['id'],
+            'code': cost_center['code'],
+            'name': cost_center['display_name'],
+            'type': cost_center_type_display(cost_center['cost_center_type']),
+            'inflow': inflow,
+            'outflow': outflow,
+            'opening_balance': opening_balance,
+            'closing_balance': opening_balance + net_cash_flow,
+            'net_cash_flow': net_cash_flow,
+        }
+
+
+def get_cash_flow_totals(start_date=None, end_date=None):
+    """Grand totals of the cost center cash flow rows, aggregated in one query"""
+    # Aggregate aliases must differ from the annotation names they sum
+    sums = annotate_cash_flow(CostCenter.objects.filter(is_active=True), start_date, end_date).aggregate(
+        inflow_sum=Sum('inflow'),
+        outflow_sum=Sum('outflow'),
+        opening_balance_sum=Sum('opening_balance'),
+    )
+    total_inflow = sums['inflow_sum'] or Decimal('0')
+    total_outflow = sums['outflow_sum'] or Decimal('0')
+    total_opening_balance = sums['opening_balance_sum'] or Decimal('0')
+    total_net_cash_flow = total_inflow - total_outflow
+    return {
+        'total_inflow': total_inflow,
+        'total_outflow': total_outflow,
+        'total_opening_balance': total_opening_balance,
+        'total_closing_balance': total_opening_balance + total_net_cash_flow,
+        'total_net_cash_flow': total_net_cash_flow,
+    }
+
+
+# Seconds the financial reports dashboard figures are cached for
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough
+FAST_COUNT_MIN_ROWS = 1000
+
+
+def fast_count(model):
+    """Row count of a whole table, estimated from pg_class on PostgreSQL
+    
+    Falls back to an exact COUNT(*) on other databases and for small tables,
+    where the planner estimate is unreliable.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                           [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= FAST_COUNT_MIN_ROWS:
+            return row[0]
+    return model.objects.count()
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None if missing or invalid"""
+    if value:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return None
+
+
+def get_date_range(request):
+    """Extract date range from request parameters, parsed once per request"""
+    if not hasattr(request, '_fr_date_range'):
+        start_date = parse_date(request.GET.get('start_date'))
+        end_date = parse_date(request.GET.get('end_date'))
         
         # Default to current month if no dates provided
         if not start_date and not end_date:
@@ -54,11 +245,50 @@ class FinancialReportsMixin:
             next_month = start_date.replace(day=28) + timedelta(days=4)
             end_date = next_month - timedelta(days=next_month.day)
         
-        return start_date, end_date
+        request._fr_date_range = (start_date, end_date)
     
-    def format_currency(self, value):
-        """Format currency value with commas"""
-        return format_number_with_commas(value)
+    return request._fr_date_range
+
+
+# Report period label when no complete date range applies
+ALL_PERIODS = "جميع الفترات"
+
+
+def period_display(start_date, end_date):
+    """Report period label shown in the page headers"""
+    if start_date and end_date:
+        return f"{start_date.isoformat()} - {end_date.isoformat()}"
+    return ALL_PERIODS
+
+
+class FinancialReportsMixin:
+    """Mixin for common financial report functionality"""
+    
+    # Exports with at least this many cost centers skip the cell-based writers
+    xml_export_min_rows = 5000
+    
+    def get_date_range(self, request):
+        """Extract date range from request parameters"""
+        return get_date_range(request)
+    
+    def get_period_display(self, start_date, end_date):
+        """Report period label for the template context"""
+        return period_display(start_date, end_date)
+    
+    def get_exporter(self, row_count, streaming=False):
+        """Return the exporter for a report with row_count cost centers
+        
+        Excel writers are imported here so that only export requests load them.
+        """
+        from .excel_utils import (
+            FinancialReportExporter, FinancialReportExporterXlsx, FinancialReportExporterXml
+        )
+        
+        if row_count >= self.xml_export_min_rows:
+            return FinancialReportExporterXml()
+        if streaming:
+            return FinancialReportExporterXlsx()
+        return FinancialReportExporter()
 
 
 @method_decorator(login_required, name='dispatch')
@@ -71,70 +301,33 @@ class CostCenterAnalysisReportView(FinancialReportsMixin, View):
         """Display cost center analysis report"""
         start_date, end_date = self.get_date_range(request)
         
-        # Get all active cost centers
-        cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-        
-        # Prepare data for each cost center
-        cost_centers_data = []
-        for cost_center in cost_centers:
-            data = {
-                'id': cost_center.id,
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'type': cost_center.get_cost_center_type_display(),
-                'total_expenses': cost_center.get_total_expenses(start_date, end_date),
-                'teacher_salaries': cost_center.get_teacher_salaries(start_date, end_date),
-                'other_expenses': cost_center.get_other_expenses(start_date, end_date),
-                'total_revenue': cost_center.get_total_revenue(start_date, end_date),
-                'course_count': cost_center.get_course_count(),
-                'profit_loss': cost_center.get_total_revenue(start_date, end_date) - cost_center.get_total_expenses(start_date, end_date),
-                'budget_variance': cost_center.monthly_budget - cost_center.get_total_expenses(start_date, end_date) if cost_center.monthly_budget else Decimal('0'),
-            }
-            cost_centers_data.append(data)
-        
-        # Calculate totals
-        totals = {
-            'total_expenses': sum(cc['total_expenses'] for cc in cost_centers_data),
-            'total_teacher_salaries': sum(cc['teacher_salaries'] for cc in cost_centers_data),
-            'total_other_expenses': sum(cc['other_expenses'] for cc in cost_centers_data),
-            'total_revenue': sum(cc['total_revenue'] for cc in cost_centers_data),
-            'total_profit_loss': sum(cc['profit_loss'] for cc in cost_centers_data),
-            'total_courses': sum(cc['course_count'] for cc in cost_centers_data),
-        }
+        # Prepare data for each active cost center (one query)
+        cost_centers_data = list(get_analysis_rows(start_date, end_date))
+        
+        # Calculate totals (aggregated in SQL)
+        totals = get_analysis_totals(start_date, end_date)
         
         context = {
             'cost_centers_data': cost_centers_data,
             'totals': totals,
             'start_date': start_date,
             'end_date': end_date,
-            'period_display': f"{start_date} - {end_date}" if start_date and end_date else "جميع الفترات",
+            'period_display': self.get_period_display(start_date, end_date),
         }
         
         return render(request, self.template_name, context)
     
     def post(self, request):
         """Export cost center analysis to Excel"""
+        from .excel_utils import create_excel_response
+        
         start_date, end_date = self.get_date_range(request)
         
-        # Get all active cost centers
-        cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-        
-        # Prepare data for Excel export
-        cost_centers_data = []
-        for cost_center in cost_centers:
-            data = {
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'total_expenses': cost_center.get_total_expenses(start_date, end_date),
-                'teacher_salaries': cost_center.get_teacher_salaries(start_date, end_date),
-                'other_expenses': cost_center.get_other_expenses(start_date, end_date),
-                'total_revenue': cost_center.get_total_revenue(start_date, end_date),
-                'course_count': cost_center.get_course_count(),
-            }
-            cost_centers_data.append(data)
+        # Rows are streamed from the database straight into the workbook
+        cost_centers_data = get_analysis_rows(start_date, end_date)
         
         # Create Excel report
-        exporter = FinancialReportExporter()
+        exporter = self.get_exporter(CostCenter.objects.filter(is_active=True).count())
         workbook = exporter.create_cost_center_analysis_report(
             cost_centers_data, start_date, end_date
         )
@@ -155,65 +348,33 @@ class CostCenterCashFlowReportView(FinancialReportsMixin, View):
         """Display cost center cash flow report"""
         start_date, end_date = self.get_date_range(request)
         
-        # Get all active cost centers
-        cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-        
-        # Prepare data for each cost center
-        cash_flow_data = []
-        for cost_center in cost_centers:
-            data = {
-                'id': cost_center.id,
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'type': cost_center.get_cost_center_type_display(),
-                'inflow': cost_center.get_cash_inflow(start_date, end_date),
-                'outflow': cost_center.get_cash_outflow(start_date, end_date),
-                'opening_balance': cost_center.get_opening_balance(start_date),
-                'closing_balance': cost_center.get_closing_balance(start_date, end_date),
-                'net_cash_flow': cost_center.get_cash_inflow(start_date, end_date) - cost_center.get_cash_outflow(start_date, end_date),
-            }
-            cash_flow_data.append(data)
-        
-        # Calculate totals
-        totals = {
-            'total_inflow': sum(cc['inflow'] for cc in cash_flow_data),
-            'total_outflow': sum(cc['outflow'] for cc in cash_flow_data),
-            'total_opening_balance': sum(cc['opening_balance'] for cc in cash_flow_data),
-            'total_closing_balance': sum(cc['closing_balance'] for cc in cash_flow_data),
-            'total_net_cash_flow': sum(cc['net_cash_flow'] for cc in cash_flow_data),
-        }
+        # Prepare data for each active cost center (one query)
+        cash_flow_data = list(get_cash_flow_rows(start_date, end_date))
+        
+        # Calculate totals (aggregated in SQL)
+        totals = get_cash_flow_totals(start_date, end_date)
         
         context = {
             'cash_flow_data': cash_flow_data,
             'totals': totals,
             'start_date': start_date,
             'end_date': end_date,
-            'period_display': f"{start_date} - {end_date}" if start_date and end_date else "جميع الفترات",
+            'period_display': self.get_period_display(start_date, end_date),
         }
         
         return render(request, self.template_name, context)
     
     def post(self, request):
         """Export cost center cash flow to Excel"""
+        from .excel_utils import create_excel_response
+        
         start_date, end_date = self.get_date_range(request)
         
-        # Get all active cost centers
-        cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-        
-        # Prepare data for Excel export
-        cash_flow_data = []
-        for cost_center in cost_centers:
-            data = {
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'inflow': cost_center.get_cash_inflow(start_date, end_date),
-                'outflow': cost_center.get_cash_outflow(start_date, end_date),
-                'opening_balance': cost_center.get_opening_balance(start_date),
-            }
-            cash_flow_data.append(data)
+        # Rows are streamed from the database straight into the workbook
+        cash_flow_data = get_cash_flow_rows(start_date, end_date)
         
         # Create Excel report
-        exporter = FinancialReportExporter()
+        exporter = self.get_exporter(CostCenter.objects.filter(is_active=True).count())
         workbook = exporter.create_cost_center_cash_flow_report(
             cash_flow_data, start_date, end_date
         )
@@ -239,12 +400,12 @@ class ComprehensiveFinancialReportView(FinancialReportsMixin, View):
         total_transactions = Transaction.objects.filter(
             journal_entry__date__gte=start_date,
             journal_entry__date__lte=end_date
-        ).count() if start_date and end_date else Transaction.objects.count()
+        ).count() if start_date and end_date else fast_count(Transaction)
         
         context = {
             'start_date': start_date,
             'end_date': end_date,
-            'period_display': f"{start_date} - {end_date}" if start_date and end_date else "جميع الفترات",
+            'period_display': self.get_period_display(start_date, end_date),
             'cost_centers_count': cost_centers_count,
             'total_transactions': total_transactions,
         }
@@ -253,37 +414,17 @@ class ComprehensiveFinancialReportView(FinancialReportsMixin, View):
     
     def post(self, request):
         """Export comprehensive financial report to Excel"""
+        from .excel_utils import create_excel_response
+        
         start_date, end_date = self.get_date_range(request)
         
-        # Get cost center analysis data
-        cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-        analysis_data = []
-        for cost_center in cost_centers:
-            data = {
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'total_expenses': cost_center.get_total_expenses(start_date, end_date),
-                'teacher_salaries': cost_center.get_teacher_salaries(start_date, end_date),
-                'other_expenses': cost_center.get_other_expenses(start_date, end_date),
-                'total_revenue': cost_center.get_total_revenue(start_date, end_date),
-                'course_count': cost_center.get_course_count(),
-            }
-            analysis_data.append(data)
-        
-        # Get cash flow data
-        cash_flow_data = []
-        for cost_center in cost_centers:
-            data = {
-                'code': cost_center.code,
-                'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-                'inflow': cost_center.get_cash_inflow(start_date, end_date),
-                'outflow': cost_center.get_cash_outflow(start_date, end_date),
-                'opening_balance': cost_center.get_opening_balance(start_date),
-            }
-            cash_flow_data.append(data)
-        
-        # Create comprehensive Excel report
-        exporter = FinancialReportExporter()
+        # Get cost center analysis and cash flow data (generators, consumed sheet by sheet)
+        analysis_data = get_analysis_rows(start_date, end_date)
+        cash_flow_data = get_cash_flow_rows(start_date, end_date)
+        
+        # Create comprehensive Excel report (largest export: stream rows with XlsxWriter)
+        row_count = CostCenter.objects.filter(is_active=True).count()
+        exporter = self.get_exporter(row_count, streaming=True)
         workbook = exporter.create_comprehensive_financial_report(
             analysis_data, cash_flow_data, start_date, end_date
         )
@@ -294,49 +435,53 @@ class ComprehensiveFinancialReportView(FinancialReportsMixin, View):
         return create_excel_response(workbook, filename)
 
 
-@login_required
-def financial_reports_dashboard(request):
-    """Financial Reports Dashboard"""
+def build_dashboard_context():
+    """Recent activity, cost center summary and monthly trends for the dashboard"""
     # Get recent activity
-    recent_transactions = Transaction.objects.select_related(
+    recent_transactions = list(Transaction.objects.select_related(
         'journal_entry', 'account', 'cost_center'
-    ).order_by('-created_at')[:10]
+    ).order_by('-created_at')[:10])
     
-    # Get cost center summary
-    cost_centers = CostCenter.objects.filter(is_active=True)
+    # Get cost center summary (all-time totals annotated in one query)
+    cost_centers = annotate_analysis(
+        CostCenter.objects.filter(is_active=True).only('id', 'code').annotate(display_name=DISPLAY_NAME))
     cost_center_summary = []
     
     for cc in cost_centers:
         summary = {
-            'name': cc.name_ar if cc.name_ar else cc.name,
+            'name': cc.display_name,
             'code': cc.code,
-            'total_expenses': cc.get_total_expenses(),
-            'total_revenue': cc.get_total_revenue(),
-            'profit_loss': cc.get_total_revenue() - cc.get_total_expenses(),
+            'total_expenses': cc.total_expenses,
+            'total_revenue': cc.total_revenue,
+            'profit_loss': cc.total_revenue - cc.total_expenses,
         }
         cost_center_summary.append(summary)
     
-    # Get monthly trends (last 6 months)
+    # Get monthly trends (last 6 months, newest first); month starts are
+    # computed once from a running month index, so no day arithmetic is needed
+    today = timezone.now().date()
+    month_index = today.year * 12 + today.month - 1
+    months = [date(index // 12, index % 12 + 1, 1) for index in range(month_index, month_index - 6, -1)]
+    next_month = date((month_index + 1) // 12, (month_index + 1) % 12 + 1, 1)
+    
+    # One grouped query for all six months
+    totals_by_month = {
+        row['month']: row
+        for row in Transaction.objects.filter(
+            journal_entry__date__gte=months[-1],
+            journal_entry__date__lt=next_month,
+            account__account_type__in=['EXPENSE', 'REVENUE'],
+        ).annotate(month=TruncMonth('journal_entry__date')).values('month').annotate(
+            expenses=Sum('amount', filter=Q(is_debit=True, account__account_type='EXPENSE')),
+            revenue=Sum('amount', filter=Q(is_debit=False, account__account_type='REVENUE')),
+        ).order_by('month')
+    }
+    
     monthly_trends = []
-    for i in range(6):
-        month_date = timezone.now().date().replace(day=1) - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        total_expenses = Transaction.objects.filter(
-            journal_entry__date__gte=month_start,
-            journal_entry__date__lte=month_end,
-            is_debit=True,
-            account__account_type='EXPENSE'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        total_revenue = Transaction.objects.filter(
-            journal_entry__date__gte=month_start,
-            journal_entry__date__lte=month_end,
-            is_debit=False,
-            account__account_type='REVENUE'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
+    for month_start in months:
+        totals = totals_by_month.get(month_start, {})
+        total_expenses = totals.get('expenses') or Decimal('0')
+        total_revenue = totals.get('revenue') or Decimal('0')
         monthly_trends.append({
             'month': month_start.strftime('%Y-%m'),
             'expenses': total_expenses,
@@ -344,11 +489,21 @@ def financial_reports_dashboard(request):
             'profit_loss': total_revenue - total_expenses,
         })
     
-    context = {
+    return {
         'recent_transactions': recent_transactions,
         'cost_center_summary': cost_center_summary,
         'monthly_trends': monthly_trends,
     }
+
+
+@login_required
+def financial_reports_dashboard(request):
+    """Financial Reports Dashboard"""
+    # Cached briefly per day; saving a transaction, cost center, course or
+    # enrollment bumps the version and so invalidates it
+    version = cache.get_or_set(DASHBOARD_CACHE_VERSION_KEY, 1, None)
+    cache_key = f"accounts:dashboard:{timezone.now().date():%Y%m%d}:{version}"
+    context = cache.get_or_set(cache_key, build_dashboard_context, DASHBOARD_CACHE_TIMEOUT)
     
     return render(request, 'accounts/reports/dashboard.html', context)
 
@@ -358,7 +513,7 @@ def financial_reports_dashboard(request):
 def cost_center_detail_report(request, cost_center_id):
     """Detailed report for a specific cost center"""
     cost_center = get_object_or_404(CostCenter, id=cost_center_id)
-    start_date, end_date = FinancialReportsMixin().get_date_range(request)
+    start_date, end_date = get_date_range(request)
     
     # Get detailed transactions for this cost center
     transactions = Transaction.objects.filter(
@@ -380,7 +535,7 @@ def cost_center_detail_report(request, cost_center_id):
         'courses': courses,
         'start_date': start_date,
         'end_date': end_date,
-        'period_display': f"{start_date} - {end_date}" if start_date and end_date else "جميع الفترات",
+        'period_display': period_display(start_date, end_date),
     }
     
     return render(request, 'accounts/reports/cost_center_detail.html', context)
@@ -395,33 +550,45 @@ def get_cost_center_data(request):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         cost_center_id = data.get('cost_center_id')
         start_date = data.get('start_date')
         end_date = data.get('end_date')
         
         if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            start_date = date.fromisoformat(start_date)
         if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        cost_center = get_object_or_404(CostCenter, id=cost_center_id)
+            end_date = date.fromisoformat(end_date)
+        
+        # All figures come from one annotated query
+        cost_centers = annotate_cash_flow(
+            annotate_analysis(CostCenter.objects.only('id', 'code').annotate(display_name=DISPLAY_NAME),
+                              start_date, end_date),
+            start_date, end_date)
+        cost_center = get_object_or_404(cost_centers, id=cost_center_id)
+        total_expenses = cost_center.total_expenses
+        teacher_salaries = cost_center.teacher_salaries
+        total_revenue = cost_center.total_revenue
+        inflow = cost_center.inflow
+        outflow = cost_center.outflow
+        opening_balance = cost_center.opening_balance
         
         response_data = {
             'code': cost_center.code,
-            'name': cost_center.name_ar if cost_center.name_ar else cost_center.name,
-            'total_expenses': float(cost_center.get_total_expenses(start_date, end_date)),
-            'teacher_salaries': float(cost_center.get_teacher_salaries(start_date, end_date)),
-            'other_expenses': float(cost_center.get_other_expenses(start_date, end_date)),
-            'total_revenue': float(cost_center.get_total_revenue(start_date, end_date)),
-            'profit_loss': float(cost_center.get_total_revenue(start_date, end_date) - cost_center.get_total_expenses(start_date, end_date)),
-            'inflow': float(cost_center.get_cash_inflow(start_date, end_date)),
-            'outflow': float(cost_center.get_cash_outflow(start_date, end_date)),
-            'opening_balance': float(cost_center.get_opening_balance(start_date)),
-            'closing_balance': float(cost_center.get_closing_balance(start_date, end_date)),
+            'name': cost_center.display_name,
+            'total_expenses': float(total_expenses),
+            'teacher_salaries': float(teacher_salaries),
+            'other_expenses': float(total_expenses - teacher_salaries),
+            'total_revenue': float(total_revenue),
+            'profit_loss': float(total_revenue - total_expenses),
+            'inflow': float(inflow),
+            'outflow': float(outflow),
+            'opening_balance': float(opening_balance),
+            'closing_balance': float(opening_balance + inflow - outflow),
         }
         
-        return JsonResponse(response_data)
+        # orjson serializes the payload in C, much faster than the stdlib encoder
+        return HttpResponse(orjson.dumps(response_data), content_type='application/json')
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -16,6 +16,7 @@ class Command(BaseCommand):
         "- ensure each student has an AR account and is linked to it\n"
         "- ensure enrollment accounts and opening entries exist\n"
         "- create missing journal entries for receipts\n"
+        "- recompute the amount paid on every enrollment\n"
         "- rebuild account balances"
     )
 
@@ -39,9 +40,11 @@ class Command(BaseCommand):
         )
 
         # 1) Ensure each student has AR account and link it
-        for student in StudentProfile.objects.all():
+        students = list(StudentProfile.objects.all())
+        ar_accounts = Account.bulk_ensure_student_ar_accounts(students)
+        for student in students:
             try:
-                acc = Account.get_or_create_student_ar_account(student)
+                acc = ar_accounts[student.id]
                 if not student.account_id:
                     student.account_id = acc.id
                     student.save(update_fields=['account'])
@@ -81,7 +84,7 @@ class Command(BaseCommand):
                 self.stderr.write(f"enrollment {enr.id}: {e}")
 
         # 3) Create missing journal entries for receipts
-        for r in StudentReceipt.objects.all().select_related('created_by', 'journal_entry'):
+        for r in StudentReceipt.objects.for_posting().select_related('journal_entry'):
             try:
                 if r.journal_entry_id is None:
                     r.create_accrual_journal_entry(r.created_by)
@@ -97,7 +100,11 @@ class Command(BaseCommand):
                     f"Receipt {r.id} ({r.receipt_number or 'NO#'}): failed to create/post journal entry: {e}"
                 )
 
-        # 4) Rebuild balances bottom-up for safety
+        # 4) Recompute the paid amounts cached on enrollments, in case receipts
+        # were written by paths that bypass the model (raw SQL, fixtures)
+        Studentenrollment.rebuild_all_amount_paid()
+
+        # 5) Rebuild balances bottom-up for safety
         Account.rebuild_all_balances()
 
         # Summary
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_course_cost_center_courseteacherassignment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['date', 'id'], name='accounts_je_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:15
+
+from django.db import migrations, models
+
+
+COVERING_INDEX = "accounts_txn_cc_je_cover_idx"
+
+
+def create_covering_index(apps, schema_editor):
+    """Let PostgreSQL sum amounts per cost center without heap lookups"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {COVERING_INDEX} ON accounts_transaction "
+            "(cost_center_id, journal_entry_id) INCLUDE (amount, is_debit)"
+        )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {COVERING_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_journalentry_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['cost_center', 'is_debit'], name='accounts_txn_cc_debit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'is_debit'], name='accounts_txn_account_debit_idx'),
+        ),
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
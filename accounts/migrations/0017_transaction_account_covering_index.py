@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+COVERING_INDEX = "accounts_txn_acct_cover_idx"
+
+
+def create_covering_index(apps, schema_editor):
+    """Let PostgreSQL sum debits and credits per account without heap lookups"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {COVERING_INDEX} ON accounts_transaction "
+            "(account_id, is_debit) INCLUDE (amount)"
+        )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {COVERING_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_transaction_report_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
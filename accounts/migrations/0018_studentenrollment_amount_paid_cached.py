@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:39
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_amount_paid(apps, schema_editor):
+    """Fill amount_paid_cached from the existing receipts in one UPDATE"""
+    Studentenrollment = apps.get_model('accounts', 'Studentenrollment')
+    StudentReceipt = apps.get_model('accounts', 'StudentReceipt')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    paid = (
+        StudentReceipt.objects.filter(enrollment=OuterRef('pk'))
+        .values('enrollment').annotate(total=Sum('paid_amount')).values('total')
+    )
+    Studentenrollment.objects.update(
+        amount_paid_cached=Coalesce(Subquery(paid, output_field=money), Value(Decimal('0.00')), output_field=money)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_transaction_account_covering_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentenrollment',
+            name='amount_paid_cached',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='المبلغ المدفوع / Amount Paid'),
+        ),
+        migrations.RunPython(backfill_amount_paid, migrations.RunPython.noop),
+    ]
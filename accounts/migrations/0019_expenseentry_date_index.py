@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_studentenrollment_amount_paid_cached'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenseentry',
+            index=models.Index(fields=['date', 'created_at'], name='accounts_exp_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_expenseentry_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeadvance',
+            index=models.Index(fields=['is_repaid', 'date'], name='accounts_eadv_repaid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentenrollment',
+            index=models.Index(fields=['enrollment_date'], name='accounts_enr_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentreceipt',
+            index=models.Index(fields=['student_profile', 'course', 'date'], name='accounts_rcpt_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacheradvance',
+            index=models.Index(fields=['teacher', 'is_repaid', 'date'], name='accounts_tadv_repaid_idx'),
+        ),
+    ]
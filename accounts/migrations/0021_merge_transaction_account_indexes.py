@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+ACCOUNT_INDEX = "accounts_txn_account_debit_idx"
+COVERING_INDEX = "accounts_txn_acct_cover_idx"
+
+
+def merge_account_indexes(apps, schema_editor):
+    """Keep one (account_id, is_debit) index on PostgreSQL: the covering one
+    
+    It serves every lookup the plain index from 0016 did, so inserts no longer
+    maintain both. It takes the plain index's name, which the model state uses.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {ACCOUNT_INDEX}")
+        schema_editor.execute(f"ALTER INDEX {COVERING_INDEX} RENAME TO {ACCOUNT_INDEX}")
+
+
+def split_account_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"ALTER INDEX {ACCOUNT_INDEX} RENAME TO {COVERING_INDEX}")
+        schema_editor.execute(
+            f"CREATE INDEX {ACCOUNT_INDEX} ON accounts_transaction (account_id, is_debit)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_report_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_account_indexes, split_account_indexes),
+    ]
@@ -1,13 +1,89 @@
-from django.db import models
+from django.db import connection, models, transaction as db_transaction
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 from django.core.exceptions import ValidationError
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, F, Case, When, Value, OuterRef, Subquery, Prefetch, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, NullIf
 import uuid
 
+from pages.signals import log_bulk_save
+
+
+# Account types whose balance grows with debits; the rest grow with credits
+DEBIT_NORMAL_TYPES = frozenset({'ASSET', 'EXPENSE'})
+
+# Codes of the cash and bank accounts used for cost center cash flows
+CASH_ACCOUNT_CODES = ('121', '1120')
+
+# Cache keys of the account id memos: id by code, code by id (to find a
+# renamed account's old entry), and the ids of the CASH_ACCOUNT_CODES accounts
+ACCOUNT_ID_CACHE_KEY = 'accounts:account_id:{}'
+ACCOUNT_CODE_CACHE_KEY = 'accounts:account_code:{}'
+CASH_ACCOUNT_IDS_CACHE_KEY = 'accounts:cash_account_ids'
+
+# Seconds an account id memo is trusted. Saving or deleting an account clears
+# the memo right away only in the cache of the process that saved it (the
+# default cache is per process), so other workers re-resolve by code once
+# their entry expires.
+ACCOUNT_ID_CACHE_TIMEOUT = 60
+
+# Account (code, name, Arabic name) that expenses are paid from, by payment method
+PAYMENT_ACCOUNTS = {
+    'CASH': ('121', 'Cash', 'النقدية'),
+    'BANK': ('1120', 'Bank Account', 'حساب البنك'),
+    'CARD': ('1120', 'Bank Account', 'حساب البنك'),
+    'TRANSFER': ('1120', 'Bank Account', 'حساب البنك'),
+}
+
+# Shared zero amounts, so hot properties and aggregates don't parse a new Decimal per call
+ZERO = Decimal('0')
+ZERO_AMOUNT = Decimal('0.00')
+
+# Arabic name when set, otherwise the name, resolved in SQL (display_name in Python)
+DISPLAY_NAME = Coalesce(NullIf('name_ar', Value('')), 'name')
+
+
+def net_balance(account_type, debit_total, credit_total):
+    """Net balance of an account of this type: debit-normal types grow with debits, the rest with credits"""
+    if account_type in DEBIT_NORMAL_TYPES:
+        return debit_total - credit_total
+    return credit_total - debit_total  # LIABILITY, EQUITY, REVENUE
+
+
+def debit_credit_totals(transactions):
+    """Sum the debit and credit amounts of a transaction queryset in one query"""
+    totals = transactions.aggregate(
+        debit=Sum('amount', filter=Q(is_debit=True)),
+        credit=Sum('amount', filter=Q(is_debit=False)),
+    )
+    return totals['debit'] or ZERO_AMOUNT, totals['credit'] or ZERO_AMOUNT
+
+
+def lock_posted_entry_id(instance, field='journal_entry'):
+    """Row-lock a source document and return the journal entry id already linked to it, if any.
+
+    Must run inside a transaction; the document row is locked before any account rows.
+    """
+    return (
+        type(instance)._default_manager.select_for_update()
+        .values_list(field, flat=True).get(pk=instance.pk)
+    )
+
+
+class PostingQuerySet(models.QuerySet):
+    def for_posting(self):
+        """Preload the relations the model's create_*_entry method reads (its POSTING_RELATED)
+        
+        Batch posting code should iterate over for_posting() querysets, so
+        posting each row issues no extra SELECTs for students, courses or staff.
+        """
+        return self.select_related(*self.model.POSTING_RELATED)
+
 
 class NumberSequence(models.Model):
     """Track sequential numbers for various document types"""
@@ -15,11 +91,41 @@ class NumberSequence(models.Model):
     last_value = models.BigIntegerField(default=0)
 
     @classmethod
-    def next_value(cls, key):
-        seq, created = cls.objects.get_or_create(key=key, defaults={'last_value': 0})
-        seq.last_value += 1
-        seq.save(update_fields=['last_value'])
-        return seq.last_value
+    def next_value(cls, key, count=1):
+        """Increment the sequence in the database and return the new value
+        
+        With count > 1 the sequence advances by count at once and the last
+        value of the reserved block is returned.
+        """
+        sequences = cls.objects.filter(key=key)
+        with db_transaction.atomic():
+            # The UPDATE locks the row, so concurrent callers never share a value
+            if not sequences.update(last_value=F('last_value') + count):
+                seq, created = cls.objects.get_or_create(key=key, defaults={'last_value': count})
+                if created:
+                    return seq.last_value
+                sequences.update(last_value=F('last_value') + count)
+            return sequences.values_list('last_value', flat=True).get()
+
+    @classmethod
+    def next_range(cls, key, count):
+        """Reserve count consecutive values with one sequence update and return them as a range"""
+        if count <= 0:
+            return range(0)
+        last_value = cls.next_value(key, count)
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    def number_documents(cls, documents, key, field, prefix):
+        """Fill the empty number field of unsaved documents from one reserved block
+        
+        Used by bulk_create overrides (see StudentReceiptQuerySet), which skip
+        the save() that would otherwise draw each number.
+        """
+        unnumbered = [document for document in documents if not getattr(document, field)]
+        for document, value in zip(unnumbered, cls.next_range(key, len(unnumbered))):
+            setattr(document, field, f"{prefix}-{value:06d}")
+        return documents
 
 
 class Account(models.Model):
@@ -49,6 +155,7 @@ class Account(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+
     class Meta:
         verbose_name = 'الحساب / Account'
         verbose_name_plural = 'الحسابات / Accounts'
@@ -67,152 +174,276 @@ class Account(models.Model):
     def get_debit_balance(self):
         """Get total debit amount for this account"""
         return self.transactions.filter(is_debit=True).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+            total=Sum('amount'))['total'] or ZERO_AMOUNT
 
     def get_credit_balance(self):
         """Get total credit amount for this account"""
         return self.transactions.filter(is_debit=False).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+            total=Sum('amount'))['total'] or ZERO_AMOUNT
+
+    def get_debit_credit_totals(self):
+        """Get total debit and credit amounts for this account in one query"""
+        return debit_credit_totals(self.transactions.all())
 
     def get_net_balance(self):
         """Calculate net balance based on account type"""
-        debit_total = self.get_debit_balance()
-        credit_total = self.get_credit_balance()
-        
-        if self.account_type in ['ASSET', 'EXPENSE']:
-            return debit_total - credit_total
-        else:  # LIABILITY, EQUITY, REVENUE
-            return credit_total - debit_total
+        debit_total, credit_total = self.get_debit_credit_totals()
+        return self.net_balance_from(debit_total, credit_total)
+
+    def net_balance_from(self, debit_total, credit_total):
+        """Net balance for the given debit and credit totals, signed by account type"""
+        return net_balance(self.account_type, debit_total, credit_total)
 
     @property
     def rollup_balance(self):
-        """Get balance including children accounts (with recursion protection)"""
-        return self._calculate_rollup_balance(set())
+        """Get balance including children accounts"""
+        # Views listing many accounts precompute this with rollup_balances()
+        if hasattr(self, '_rollup_balance'):
+            return self._rollup_balance
+        return Account.rollup_balances([self.id]).get(self.id, ZERO_AMOUNT)
     
-    def _calculate_rollup_balance(self, visited_ids):
-        """Calculate rollup balance with recursion protection"""
-        if self.id in visited_ids:
-            return Decimal('0.00')  # Prevent infinite recursion
-        
-        visited_ids.add(self.id)
-        own_balance = self.get_net_balance()
-        children_balance = Decimal('0.00')
-        
-        for child in self.children.all():
-            children_balance += child._calculate_rollup_balance(visited_ids.copy())
-        
-        return own_balance + children_balance
+    @classmethod
+    def rollup_balances(cls, account_ids=None):
+        """Map account id to its net balance plus its descendants' in one query
+        
+        A recursive CTE pairs every account with each of its descendants;
+        UNION (not UNION ALL) stops cycles in the parent chain. Each
+        transaction is signed by the type of the account it was posted to,
+        as get_net_balance does. Covers all accounts, or the given ids.
+        """
+        anchor_filter = ''
+        anchor_params = []
+        if account_ids is not None:
+            if not account_ids:
+                return {}
+            anchor_filter = f"WHERE id IN ({', '.join(['%s'] * len(account_ids))})"
+            anchor_params = list(account_ids)
+        debit_normal_types = sorted(DEBIT_NORMAL_TYPES)
+        
+        account_table = cls._meta.db_table
+        transaction_table = Transaction._meta.db_table
+        sql = f"""
+            WITH RECURSIVE tree(id, root_id) AS (
+                SELECT id, id FROM {account_table} {anchor_filter}
+                UNION
+                SELECT child.id, tree.root_id
+                FROM {account_table} child JOIN tree ON child.parent_id = tree.id
+            )
+            SELECT tree.root_id, SUM(
+                CASE WHEN t.is_debit THEN t.amount ELSE -t.amount END
+                * CASE WHEN a.account_type IN ({', '.join(['%s'] * len(debit_normal_types))}) THEN 1 ELSE -1 END
+            )
+            FROM tree
+            JOIN {account_table} a ON a.id = tree.id
+            JOIN {transaction_table} t ON t.account_id = tree.id
+            GROUP BY tree.root_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*anchor_params, *debit_normal_types])
+            rows = cursor.fetchall()
+        return {
+            root_id: Decimal(str(total or 0)).quantize(Decimal('0.01'))
+            for root_id, total in rows
+        }
 
     def transactions_with_descendants(self):
         """Get all transactions for this account and its descendants"""
-        account_ids = [self.id]
-        
-        def collect_children(account):
-            for child in account.children.all():
-                account_ids.append(child.id)
-                collect_children(child)
-        
-        collect_children(self)
-        return Transaction.objects.filter(account_id__in=account_ids)
+        return Transaction.objects.filter(account_id__in=type(self).subtree_ids(self.id))
 
     def recalculate_tree_balances(self):
         """Recalculate balances for this account and all its children"""
-        # Recalculate children first (bottom-up)
-        for child in self.children.all():
-            child.recalculate_tree_balances()
-        
-        # Then recalculate this account
-        self.balance = self.get_net_balance()
-        self.save(update_fields=['balance'])
+        type(self).recalculate_subtree(self.pk)
+        self.refresh_from_db(fields=['balance'])
+
+    @classmethod
+    def net_balance_expression(cls):
+        """Expression for an account's own net balance, as get_net_balance computes it"""
+        money = models.DecimalField(max_digits=15, decimal_places=2)
+        # Debits minus credits per account, as a correlated subquery
+        net = Transaction.objects.filter(account=OuterRef('pk')).order_by().values('account').annotate(
+            net=Sum(Case(When(is_debit=True, then=F('amount')), default=-F('amount'), output_field=money))
+        ).values('net')
+        net = Coalesce(Subquery(net, output_field=money), Value(ZERO_AMOUNT), output_field=money)
+        return Case(
+            When(account_type__in=sorted(DEBIT_NORMAL_TYPES), then=net),
+            default=-net,  # LIABILITY, EQUITY, REVENUE
+            output_field=money,
+        )
+
+    @classmethod
+    def subtree_ids(cls, *root_ids):
+        """Subquery selecting the ids of the given accounts and all their descendants
+        
+        A recursive CTE walks the tree in the database; UNION (not UNION ALL)
+        stops cycles in the parent chain. Use it as an ``__in`` lookup value.
+        """
+        account_table = cls._meta.db_table
+        return RawSQL(f"""
+            WITH RECURSIVE subtree(id) AS (
+                SELECT id FROM {account_table} WHERE id IN ({', '.join(['%s'] * len(root_ids))})
+                UNION
+                SELECT child.id FROM {account_table} child JOIN subtree ON child.parent_id = subtree.id
+            )
+            SELECT id FROM subtree
+        """, root_ids)
+
+    @classmethod
+    def recalculate_subtree(cls, *root_ids):
+        """Recalculate balances for the given accounts and all their descendants in one UPDATE"""
+        if not root_ids:
+            return
+        cls.objects.filter(id__in=cls.subtree_ids(*root_ids)).update(balance=cls.net_balance_expression())
 
     @classmethod
     def rebuild_all_balances(cls):
-        """Rebuild all account balances from transactions"""
-        for account in cls.objects.all():
-            account.balance = account.get_net_balance()
-            account.save(update_fields=['balance'])
+        """Rebuild all account balances from transactions in a single UPDATE"""
+        cls.objects.update(balance=cls.net_balance_expression())
+
+    @classmethod
+    def get_account_id(cls, code, defaults):
+        """Get or create the parent or system account with this code and return its id
+        
+        The id is memoized in the cache for ACCOUNT_ID_CACHE_TIMEOUT seconds,
+        so callers creating many sub-accounts or postings look the account up
+        only once. It is memoized on commit, so a rolled back account is never
+        remembered. Saving or deleting the account (e.g. changing its code)
+        drops it from this process's cache; other processes resolve the code
+        again when their entry expires.
+        """
+        account_id = cache.get(ACCOUNT_ID_CACHE_KEY.format(code))
+        if account_id is None:
+            account_id = cls.objects.get_or_create(code=code, defaults=defaults)[0].id
+            db_transaction.on_commit(lambda: cache.set_many({
+                ACCOUNT_ID_CACHE_KEY.format(code): account_id,
+                ACCOUNT_CODE_CACHE_KEY.format(account_id): code,
+            }, ACCOUNT_ID_CACHE_TIMEOUT))
+        return account_id
+
+    @classmethod
+    def cash_account_id(cls):
+        """Id of the cash account (121) that cash receipts and payments post to"""
+        return cls.get_account_id('121', {
+            'name': 'Cash',
+            'name_ar': 'النقدية',
+            'account_type': 'ASSET',
+            'is_active': True,
+        })
+
+    @classmethod
+    def cash_account_ids(cls):
+        """Ids of the cash and bank accounts, so cash flow queries need no join on code
+        
+        Memoized like get_account_id() once every code in CASH_ACCOUNT_CODES
+        has an account; saving or deleting one of them clears the memo.
+        """
+        ids = cache.get(CASH_ACCOUNT_IDS_CACHE_KEY)
+        if ids is not None:
+            return ids
+        ids = tuple(cls.objects.filter(code__in=CASH_ACCOUNT_CODES).values_list('id', flat=True))
+        if len(ids) == len(CASH_ACCOUNT_CODES):
+            cache.set(CASH_ACCOUNT_IDS_CACHE_KEY, ids, ACCOUNT_ID_CACHE_TIMEOUT)
+        return ids
+
+    @classmethod
+    def student_ar_account_defaults(cls, student):
+        """Field values of a new AR account for student, creating the AR parent if needed"""
+        # Ensure AR parent exists
+        ar_parent_id = cls.get_account_id('1251', {
+            'name': 'Accounts Receivable - Students',
+            'name_ar': 'ذمم الطلاب المدينة',
+            'account_type': 'ASSET',
+            'is_active': True,
+        })
+        return {
+            'name': f"AR - {student.full_name}",
+            'name_ar': f"ذمة {student.full_name}",
+            'account_type': 'ASSET',
+            'parent_id': ar_parent_id,
+            'is_student_account': True,
+            'student_name': student.full_name,
+            'is_active': True,
+        }
 
     @classmethod
     def get_or_create_student_ar_account(cls, student):
         """Get or create AR account for student"""
-        # Ensure AR parent exists
-        ar_parent, _ = cls.objects.get_or_create(
-            code='1251',
-            defaults={
-                'name': 'Accounts Receivable - Students',
-                'name_ar': 'ذمم الطلاب المدينة',
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
-        
         # Create student-specific AR account
         student_code = f"1251-{student.id:03d}"
         account, created = cls.objects.get_or_create(
             code=student_code,
-            defaults={
-                'name': f"AR - {student.full_name}",
-                'name_ar': f"ذمة {student.full_name}",
-                'account_type': 'ASSET',
-                'parent': ar_parent,
-                'is_student_account': True,
-                'student_name': student.full_name,
-                'is_active': True,
-            }
+            defaults=cls.student_ar_account_defaults(student),
         )
         return account
 
     @classmethod
-    def get_or_create_course_deferred_account(cls, course):
-        """Get or create deferred revenue account for course"""
-        # Ensure deferred revenue parent exists
-        deferred_parent, _ = cls.objects.get_or_create(
-            code='21',
-            defaults={
-                'name': 'Deferred Revenue - Courses',
-                'name_ar': 'إيرادات مؤجلة - الدورات',
-                'account_type': 'LIABILITY',
-                'is_active': True,
-            }
-        )
-
-
-        # =========================
-
-        
-        # Create course-specific deferred revenue account
-        course_code = f"21001-{course.id:03d}"
-        account, created = cls.objects.get_or_create(
-            code=course_code,
-            defaults={
-                'name': f"Deferred Revenue - {course.name}",
-                'name_ar': f"إيرادات مؤجلة - {course.name}",
-                'account_type': 'LIABILITY',
-                'parent': deferred_parent,
-                'is_course_account': True,
-                'course_name': course.name,
-                'is_active': True,
-            }
-        )
+    def bulk_ensure_student_ar_accounts(cls, students):
+        """Get or create the AR accounts of many students, mapped by student id
+        
+        Missing accounts are inserted with one bulk_create that skips codes
+        which already exist, then all accounts are read back in one query.
+        """
+        students_by_code = {f"1251-{student.id:03d}": student for student in students}
+        if not students_by_code:
+            return {}
+        cls.objects.bulk_create([
+            cls(code=code, **cls.student_ar_account_defaults(student))
+            for code, student in students_by_code.items()
+        ], ignore_conflicts=True, batch_size=1000)
+        return {
+            students_by_code[account.code].id: account
+            for account in cls.objects.filter(code__in=students_by_code)
+        }
 
+    @classmethod
+    def course_deferred_account_defaults(cls, course):
+        """Field values of a new deferred revenue account for course, creating the parent if needed"""
+        # Ensure deferred revenue parent exists
+        deferred_parent_id = cls.get_account_id('21', {
+            'name': 'Deferred Revenue - Courses',
+            'name_ar': 'إيرادات مؤجلة - الدورات',
+            'account_type': 'LIABILITY',
+            'is_active': True,
+        })
+        return {
+            'name': f"Deferred Revenue - {course.name}",
+            'name_ar': f"  إيرادات  دورة - {course.name}",
+            'account_type': 'REVENUE',
+            'parent_id': deferred_parent_id,
+            'is_course_account': True,
+            'course_name': course.name,
+            'is_active': True,
+        }
 
-        # ===================
-               # Create course-specific deferred revenue account
+    @classmethod
+    def get_or_create_course_deferred_account(cls, course):
+        """Get or create deferred revenue account for course"""
+        # Create the course-specific account that enrollment entries credit
         course_code = f"4101-{course.id:03d}"
         account, created = cls.objects.get_or_create(
             code=course_code,
-            defaults={
-                'name': f"Deferred Revenue - {course.name}",
-                'name_ar': f"  إيرادات  دورة - {course.name}",
-                'account_type': 'REVENUE',
-                'parent': deferred_parent,
-                'is_course_account': True,
-                'course_name': course.name,
-                'is_active': True,
-            }
+            defaults=cls.course_deferred_account_defaults(course),
         )
         return account
 
+    @classmethod
+    def bulk_ensure_course_deferred_accounts(cls, courses):
+        """Get or create the deferred revenue accounts of many courses, mapped by course id
+        
+        Works like bulk_ensure_student_ar_accounts(), so bulk enrollment posting
+        can resolve every course once and pass the account to each entry.
+        """
+        courses_by_code = {f"4101-{course.id:03d}": course for course in courses}
+        if not courses_by_code:
+            return {}
+        cls.objects.bulk_create([
+            cls(code=code, **cls.course_deferred_account_defaults(course))
+            for code, course in courses_by_code.items()
+        ], ignore_conflicts=True, batch_size=1000)
+        return {
+            courses_by_code[account.code].id: account
+            for account in cls.objects.filter(code__in=courses_by_code)
+        }
+
 
 class CostCenter(models.Model):
     COST_CENTER_TYPE_CHOICES = [
@@ -260,30 +491,20 @@ class CostCenter(models.Model):
         
         # Sum debit transactions (expenses)
         return transactions.filter(is_debit=True).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+            total=Sum('amount'))['total'] or ZERO_AMOUNT
     
     def get_teacher_salaries(self, start_date=None, end_date=None):
         """Get teacher salaries allocated to this cost center based on course assignments"""
-        from django.db.models import Sum
-        total_salary = Decimal('0.00')
+        # Active assignments on this cost center's active courses, summed in one query
+        assignments = CourseTeacherAssignment.objects.filter(
+            course__cost_center=self, course__is_active=True, is_active=True)
         
-        # Get all courses assigned to this cost center
-        courses = self.courses.filter(is_active=True)
-        
-        for course in courses:
-            # Get teacher assignments for this course
-            assignments = course.courseteacherassignment_set.filter(is_active=True)
-            
-            if start_date:
-                assignments = assignments.filter(start_date__gte=start_date)
-            if end_date:
-                assignments = assignments.filter(start_date__lte=end_date)
-            
-            # Calculate total salary for each assignment
-            for assignment in assignments:
-                total_salary += assignment.calculate_total_salary()
+        if start_date:
+            assignments = assignments.filter(start_date__gte=start_date)
+        if end_date:
+            assignments = assignments.filter(start_date__lte=end_date)
         
-        return total_salary
+        return assignments.aggregate(total=Sum(ASSIGNMENT_SALARY))['total'] or ZERO_AMOUNT
     
     def get_course_count(self):
         """Get number of courses associated with this cost center"""
@@ -291,16 +512,15 @@ class CostCenter(models.Model):
     
     def get_total_revenue(self, start_date=None, end_date=None):
         """Get total revenue for this cost center from course enrollments"""
-        from django.db.models import Sum
-        total_revenue = Decimal('0.00')
+        # Enrollments in this cost center's active courses, summed in one query
+        enrollments = Studentenrollment.objects.filter(course__cost_center=self, course__is_active=True)
         
-        # Get all courses assigned to this cost center
-        courses = self.courses.filter(is_active=True)
-        
-        for course in courses:
-            total_revenue += course.get_total_revenue(start_date, end_date)
+        if start_date:
+            enrollments = enrollments.filter(enrollment_date__gte=start_date)
+        if end_date:
+            enrollments = enrollments.filter(enrollment_date__lte=end_date)
         
-        return total_revenue
+        return enrollments.aggregate(total=Sum('total_amount'))['total'] or ZERO_AMOUNT
     
     def get_other_expenses(self, start_date=None, end_date=None):
         """Get other expenses (non-salary) for this cost center"""
@@ -312,7 +532,7 @@ class CostCenter(models.Model):
         """Get cash inflow for this cost center"""
         from django.db.models import Sum
         transactions = self.transaction_set.filter(
-            account__code__in=['121', '1120'],  # Cash and Bank accounts
+            account_id__in=Account.cash_account_ids(),  # Cash and Bank accounts
             is_debit=True  # Cash inflow is debit to cash accounts
         )
         
@@ -321,13 +541,13 @@ class CostCenter(models.Model):
         if end_date:
             transactions = transactions.filter(journal_entry__date__lte=end_date)
         
-        return transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        return transactions.aggregate(total=Sum('amount'))['total'] or ZERO_AMOUNT
     
     def get_cash_outflow(self, start_date=None, end_date=None):
         """Get cash outflow for this cost center"""
         from django.db.models import Sum
         transactions = self.transaction_set.filter(
-            account__code__in=['121', '1120'],  # Cash and Bank accounts
+            account_id__in=Account.cash_account_ids(),  # Cash and Bank accounts
             is_debit=False  # Cash outflow is credit to cash accounts
         )
         
@@ -336,31 +556,40 @@ class CostCenter(models.Model):
         if end_date:
             transactions = transactions.filter(journal_entry__date__lte=end_date)
         
-        return transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        return transactions.aggregate(total=Sum('amount'))['total'] or ZERO_AMOUNT
     
     def get_opening_balance(self, start_date=None):
         """Get opening balance for this cost center"""
         if not start_date:
-            return Decimal('0.00')
+            return ZERO_AMOUNT
         
-        from django.db.models import Sum
         transactions = self.transaction_set.filter(
             journal_entry__date__lt=start_date
         )
         
         # Calculate net balance before start date
-        debit_total = transactions.filter(is_debit=True).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
-        credit_total = transactions.filter(is_debit=False).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+        debit_total, credit_total = debit_credit_totals(transactions)
         
         return debit_total - credit_total
     
+    def get_cash_flows(self, start_date=None, end_date=None):
+        """Get cash inflow and outflow for this cost center in one query"""
+        transactions = self.transaction_set.filter(
+            account_id__in=Account.cash_account_ids(),  # Cash and Bank accounts
+        )
+        
+        if start_date:
+            transactions = transactions.filter(journal_entry__date__gte=start_date)
+        if end_date:
+            transactions = transactions.filter(journal_entry__date__lte=end_date)
+        
+        # Debits to cash accounts are inflows, credits are outflows
+        return debit_credit_totals(transactions)
+    
     def get_closing_balance(self, start_date=None, end_date=None):
         """Get closing balance for this cost center"""
         opening_balance = self.get_opening_balance(start_date)
-        inflow = self.get_cash_inflow(start_date, end_date)
-        outflow = self.get_cash_outflow(start_date, end_date)
+        inflow, outflow = self.get_cash_flows(start_date, end_date)
         
         return opening_balance + inflow - outflow
 
@@ -416,6 +645,10 @@ class JournalEntry(models.Model):
         verbose_name = 'قيد اليومية / Journal Entry'
         verbose_name_plural = 'قيود اليومية / Journal Entries'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Report period filters join transactions to their entry by date
+            models.Index(fields=['date', 'id'], name='accounts_je_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.reference} - {self.date}"
@@ -430,15 +663,39 @@ class JournalEntry(models.Model):
 
     def get_total_debits(self):
         return self.transactions.filter(is_debit=True).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+            total=Sum('amount'))['total'] or ZERO_AMOUNT
 
     def get_total_credits(self):
         return self.transactions.filter(is_debit=False).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
+            total=Sum('amount'))['total'] or ZERO_AMOUNT
+
+    def get_debit_credit_totals(self):
+        return debit_credit_totals(self.transactions.all())
 
     @property
     def is_balanced(self):
-        return abs(self.get_total_debits() - self.get_total_credits()) < Decimal('0.01')
+        total_debits, total_credits = self.get_debit_credit_totals()
+        return abs(total_debits - total_credits) < Decimal('0.01')
+
+    def add_double_entry(self, debit_account_id, credit_account_id, amount, debit_description, credit_description):
+        """Add a debit line and a matching credit line to this entry in one INSERT"""
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                journal_entry=self,
+                account_id=debit_account_id,
+                amount=amount,
+                is_debit=True,
+                description=debit_description
+            ),
+            Transaction(
+                journal_entry=self,
+                account_id=credit_account_id,
+                amount=amount,
+                is_debit=False,
+                description=credit_description
+            ),
+        ])
+        transactions_bulk_created(transactions)
 
     def post_entry(self, user):
         """Post the journal entry and update account balances"""
@@ -448,42 +705,144 @@ class JournalEntry(models.Model):
         if not self.is_balanced:
             raise ValueError("Entry is not balanced")
         
-        self.is_posted = True
-        self.posted_at = timezone.now()
-        self.posted_by = user
-        self.save(update_fields=['is_posted', 'posted_at', 'posted_by'])
-        
-        # Update account balances
-        for transaction in self.transactions.all():
-            transaction.account.recalculate_tree_balances()
+        # Mark posted and update balances in one database transaction
+        with db_transaction.atomic():
+            self.is_posted = True
+            self.posted_at = timezone.now()
+            self.posted_by = user
+            self.save(update_fields=['is_posted', 'posted_at', 'posted_by'])
+            
+            # Update balances of the distinct accounts posted to (and their subtrees) at once
+            account_ids = set(self.transactions.values_list('account_id', flat=True))
+            Account.recalculate_subtree(*account_ids)
 
     def reverse_entry(self, user, description=None):
         """Create a reversing journal entry"""
-        if not self.is_posted:
-            raise ValueError("Cannot reverse unposted entry")
-        
-        reversing_entry = JournalEntry.objects.create(
-            date=timezone.now().date(),
-            description=description or f"Reversal of {self.reference}",
-            entry_type='ADJUSTMENT',
-            total_amount=self.total_amount,
-            created_by=user
-        )
-        
-        # Create reversing transactions
-        for transaction in self.transactions.all():
-            Transaction.objects.create(
-                journal_entry=reversing_entry,
-                account=transaction.account,
-                amount=transaction.amount,
-                is_debit=not transaction.is_debit,  # Reverse the debit/credit
-                description=f"Reversal: {transaction.description}",
-                cost_center=transaction.cost_center
-            )
+        return JournalEntry.bulk_reverse([self], user, description)[0]
+
+    @classmethod
+    def bulk_reverse(cls, entries, user, description=None):
+        """Create and post reversing journal entries for many posted entries at once
+        
+        The reversing entries and their transactions are each inserted with
+        one bulk_create, their references come from one sequence update, and
+        account balances are recalculated once for all affected accounts.
+        """
+        entries = list(entries)
+        prefetch_related_objects(entries, Prefetch(
+            'transactions',
+            queryset=Transaction.objects.only(
+                'journal_entry_id', 'account_id', 'amount', 'is_debit', 'description', 'cost_center_id'),
+        ))
+        for entry in entries:
+            if not entry.is_posted:
+                raise ValueError("Cannot reverse unposted entry")
+            total_debits = sum((t.amount for t in entry.transactions.all() if t.is_debit), ZERO_AMOUNT)
+            total_credits = sum((t.amount for t in entry.transactions.all() if not t.is_debit), ZERO_AMOUNT)
+            if abs(total_debits - total_credits) >= Decimal('0.01'):
+                raise ValueError("Entry is not balanced")
+        if not entries:
+            return []
         
-        # Post the reversing entry
-        reversing_entry.post_entry(user)
-        return reversing_entry
+        today = timezone.now().date()
+        now = timezone.now()
+        with db_transaction.atomic():
+            # Reserve one reference per reversing entry in a single sequence update
+            numbers = NumberSequence.next_range('journal_entry', len(entries))
+            reversing_entries = cls.objects.bulk_create([
+                cls(
+                    reference=f"JE-{number:06d}",
+                    date=today,
+                    description=description or f"Reversal of {entry.reference}",
+                    entry_type='ADJUSTMENT',
+                    total_amount=entry.total_amount,
+                    created_by=user,
+                    # Reversing a balanced, posted entry yields a balanced entry
+                    is_posted=True,
+                    posted_at=now,
+                    posted_by=user,
+                )
+                for number, entry in zip(numbers, entries)
+            ])
+            
+            # Create all reversing transactions in one INSERT
+            transactions = Transaction.objects.bulk_create([
+                Transaction(
+                    journal_entry=reversing_entry,
+                    account_id=transaction.account_id,
+                    amount=transaction.amount,
+                    is_debit=not transaction.is_debit,  # Reverse the debit/credit
+                    description=f"Reversal: {transaction.description}",
+                    cost_center_id=transaction.cost_center_id
+                )
+                for entry, reversing_entry in zip(entries, reversing_entries)
+                for transaction in entry.transactions.all()
+            ], batch_size=500)
+            
+            Account.recalculate_subtree(*{
+                transaction.account_id for entry in entries for transaction in entry.transactions.all()
+            })
+        # bulk_create sends no post_save signals
+        log_bulk_save(cls, reversing_entries)
+        transactions_bulk_created(transactions)
+        return reversing_entries
+
+    @classmethod
+    def bulk_post(cls, items, user):
+        """Create and post many two-line journal entries at once
+        
+        Each item is a dict with date, description, entry_type, amount,
+        debit_account_id, credit_account_id, debit_description and
+        credit_description. The entries and their transactions are each
+        inserted with one bulk_create and account balances are recalculated
+        once; the created entries are returned in item order.
+        """
+        items = list(items)
+        for item in items:
+            if item['amount'] <= 0:
+                raise ValueError("Entry amount must be positive")
+        if not items:
+            return []
+        
+        now = timezone.now()
+        with db_transaction.atomic():
+            numbers = NumberSequence.next_range('journal_entry', len(items))
+            entries = cls.objects.bulk_create([
+                cls(
+                    reference=f"JE-{number:06d}",
+                    date=item['date'],
+                    description=item['description'],
+                    entry_type=item['entry_type'],
+                    total_amount=item['amount'],
+                    created_by=user,
+                    # Every entry is one equal debit and credit, so it is balanced
+                    is_posted=True,
+                    posted_at=now,
+                    posted_by=user,
+                )
+                for number, item in zip(numbers, items)
+            ])
+            transactions = Transaction.objects.bulk_create([
+                Transaction(
+                    journal_entry=entry,
+                    account_id=item[account_key],
+                    amount=item['amount'],
+                    is_debit=is_debit,
+                    description=item[description_key],
+                )
+                for entry, item in zip(entries, items)
+                for account_key, description_key, is_debit in (
+                    ('debit_account_id', 'debit_description', True),
+                    ('credit_account_id', 'credit_description', False),
+                )
+            ], batch_size=500)
+            Account.recalculate_subtree(*{
+                item[account_key] for item in items for account_key in ('debit_account_id', 'credit_account_id')
+            })
+        # bulk_create sends no post_save signals
+        log_bulk_save(cls, entries)
+        transactions_bulk_created(transactions)
+        return entries
 
 
 class Transaction(models.Model):
@@ -498,17 +857,23 @@ class Transaction(models.Model):
     class Meta:
         verbose_name = 'المعاملة / Transaction'
         verbose_name_plural = 'المعاملات / Transactions'
+        indexes = [
+            # Report aggregates split amounts by side per cost center and per account
+            models.Index(fields=['cost_center', 'is_debit'], name='accounts_txn_cc_debit_idx'),
+            # On PostgreSQL this index also INCLUDEs amount (migrations 0017 and 0021)
+            models.Index(fields=['account', 'is_debit'], name='accounts_txn_account_debit_idx'),
+        ]
 
     def __str__(self):
         return f"{self.account.code} - {self.amount} ({'Dr' if self.is_debit else 'Cr'})"
 
     @property
     def debit_amount(self):
-        return self.amount if self.is_debit else Decimal('0.00')
+        return self.amount if self.is_debit else ZERO_AMOUNT
 
     @property
     def credit_amount(self):
-        return self.amount if not self.is_debit else Decimal('0.00')
+        return self.amount if not self.is_debit else ZERO_AMOUNT
 
 
 class Course(models.Model):
@@ -552,7 +917,6 @@ class Course(models.Model):
     
     def get_total_teacher_salaries(self, start_date=None, end_date=None):
         """Get total teacher salaries for this course"""
-        from django.db.models import Sum
         assignments = self.courseteacherassignment_set.all()
         
         if start_date:
@@ -560,11 +924,8 @@ class Course(models.Model):
         if end_date:
             assignments = assignments.filter(start_date__lte=end_date)
         
-        total_salary = Decimal('0.00')
-        for assignment in assignments:
-            total_salary += assignment.calculate_total_salary()
-        
-        return total_salary
+        # Summed in SQL rather than loading every assignment row
+        return assignments.aggregate(total=Sum(ASSIGNMENT_SALARY))['total'] or ZERO_AMOUNT
     
     def get_enrollment_count(self, start_date=None, end_date=None):
         """Get number of enrollments for this course"""
@@ -587,7 +948,7 @@ class Course(models.Model):
         if end_date:
             enrollments = enrollments.filter(enrollment_date__lte=end_date)
         
-        return enrollments.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+        return enrollments.aggregate(total=Sum('total_amount'))['total'] or ZERO_AMOUNT
 
 
 class CourseTeacherAssignment(models.Model):
@@ -628,13 +989,23 @@ class CourseTeacherAssignment(models.Model):
             return self.hourly_rate * self.total_hours
         elif self.monthly_rate:
             return self.monthly_rate
-        return Decimal('0.00')
+        return ZERO_AMOUNT
 
     def get_cost_center(self):
         """Get the cost center for this assignment"""
         return self.course.cost_center if self.course.cost_center else None
 
 
+# CourseTeacherAssignment.calculate_total_salary() as a SQL expression
+ASSIGNMENT_SALARY = Case(
+    When(Q(hourly_rate__isnull=False, total_hours__gt=0) & ~Q(hourly_rate=0),
+         then=F('hourly_rate') * F('total_hours')),
+    When(Q(monthly_rate__isnull=False) & ~Q(monthly_rate=0), then=F('monthly_rate')),
+    default=Value(ZERO_AMOUNT),
+    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+)
+
+
 class Student(models.Model):
     student_id = models.CharField(max_length=20, unique=True, verbose_name='رقم الطالب / Student ID')
     name = models.CharField(max_length=200, verbose_name='الاسم / Name')
@@ -682,14 +1053,24 @@ class Studentenrollment(models.Model):
     enrollment_journal_entry = models.ForeignKey(JournalEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='enrollments', verbose_name='قيد التسجيل / enrollment Entry')
     completion_journal_entry = models.ForeignKey(JournalEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='completions', verbose_name='قيد الإكمال / Completion Entry')
     
+    # Running total of the linked receipts, kept current by StudentReceipt.save() and delete signals
+    amount_paid_cached = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, verbose_name='المبلغ المدفوع / Amount Paid')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    POSTING_RELATED = ('student__account', 'course')
+    objects = PostingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'تسجيل الطالب / Student enrollment'
         verbose_name_plural = 'تسجيلات الطلاب / Student enrollments'
         ordering = ['-enrollment_date']
         unique_together = ('student', 'course')
+        indexes = [
+            # Report periods and cost center revenue filter by enrollment date
+            models.Index(fields=['enrollment_date'], name='accounts_enr_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.full_name} - {self.course.name}"
@@ -697,23 +1078,55 @@ class Studentenrollment(models.Model):
     @property
     def net_amount(self):
         """Calculate net amount after discounts"""
-        after_percent = self.total_amount - (self.total_amount * self.discount_percent / Decimal('100'))
-        return max(Decimal('0'), after_percent - self.discount_amount)
+        net = self.total_amount * (100 - self.discount_percent) / 100 - self.discount_amount
+        return net if net > 0 else ZERO
 
     @property
     def amount_paid(self):
         """Total amount paid for this enrollment"""
-        return self.payments.aggregate(total=Sum('paid_amount'))['total'] or Decimal('0.00')
+        return self.amount_paid_cached
+
+    @classmethod
+    def amount_paid_expression(cls):
+        """Expression for the sum of an enrollment's receipts, as amount_paid_cached stores it"""
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        paid = (
+            StudentReceipt.objects.filter(enrollment=OuterRef('pk'))
+            .values('enrollment').annotate(total=Sum('paid_amount')).values('total')
+        )
+        return Coalesce(Subquery(paid, output_field=money), Value(ZERO_AMOUNT), output_field=money)
+
+    @classmethod
+    def recalculate_amount_paid(cls, *enrollment_ids):
+        """Recompute amount_paid_cached from the receipts of these enrollments in one UPDATE"""
+        enrollment_ids = [enrollment_id for enrollment_id in enrollment_ids if enrollment_id]
+        if not enrollment_ids:
+            return
+        cls.objects.filter(pk__in=enrollment_ids).update(amount_paid_cached=cls.amount_paid_expression())
+
+    @classmethod
+    def rebuild_all_amount_paid(cls):
+        """Recompute amount_paid_cached for every enrollment in a single UPDATE"""
+        cls.objects.update(amount_paid_cached=cls.amount_paid_expression())
 
     @property
     def balance_due(self):
         """Remaining balance due"""
-        return max(Decimal('0'), self.net_amount - self.amount_paid)
+        remaining = self.net_amount - self.amount_paid
+        return remaining if remaining > 0 else ZERO
 
-    def create_accrual_enrollment_entry(self, user):
-        """Create enrollment accrual entry: DR Student AR, CR Deferred Revenue"""
+    @db_transaction.atomic
+    def create_accrual_enrollment_entry(self, user, deferred_account=None):
+        """Create enrollment accrual entry: DR Student AR, CR Deferred Revenue
+        
+        Bulk callers can pass the course's deferred revenue account, e.g. from
+        Account.bulk_ensure_course_deferred_accounts(), to skip its lookup.
+        """
         if self.enrollment_journal_entry:
             return self.enrollment_journal_entry
+        if lock_posted_entry_id(self, 'enrollment_journal_entry'):
+            self.refresh_from_db(fields=['enrollment_journal_entry'])
+            return self.enrollment_journal_entry
         
         net_amount = self.net_amount
         if net_amount <= 0:
@@ -721,7 +1134,7 @@ class Studentenrollment(models.Model):
         
         # Get accounts
         student_ar_account = self.student.ar_account
-        course_deferred_account = Account.get_or_create_course_deferred_account(self.course)
+        course_deferred_account = deferred_account or Account.get_or_create_course_deferred_account(self.course)
         
         # Create journal entry
         entry = JournalEntry.objects.create(
@@ -732,22 +1145,13 @@ class Studentenrollment(models.Model):
             created_by=user
         )
         
-        # DR: Student AR
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=student_ar_account,
-            amount=net_amount,
-            is_debit=True,
-            description=f"enrollment - {self.student.full_name}"
-        )
-        
-        # CR: Deferred Revenue
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=course_deferred_account,
-            amount=net_amount,
-            is_debit=False,
-            description=f"Deferred revenue - {self.course.name}"
+        # DR: Student AR, CR: Deferred Revenue
+        entry.add_double_entry(
+            student_ar_account.id,
+            course_deferred_account.id,
+            net_amount,
+            f"enrollment - {self.student.full_name}",
+            f"Deferred revenue - {self.course.name}"
         )
         
         # Post the entry
@@ -755,11 +1159,59 @@ class Studentenrollment(models.Model):
         
         # Link to enrollment
         self.enrollment_journal_entry = entry
-        self.save(update_fields=['enrollment_journal_entry'])
+        type(self).objects.filter(pk=self.pk).update(enrollment_journal_entry=entry)
         
         return entry
 
 
+class StudentReceiptQuerySet(PostingQuerySet):
+    """Keeps Studentenrollment.amount_paid_cached in step on the bulk write paths
+    
+    save() and the post_delete receiver cover single receipts; bulk_create,
+    bulk_update and update() recalculate the enrollments they touch here.
+    bulk_create also numbers the receipts, as save() would.
+    """
+    
+    # Receipt fields that amount_paid_cached is computed from
+    AMOUNT_PAID_FIELDS = frozenset({'enrollment', 'enrollment_id', 'paid_amount'})
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with db_transaction.atomic(using=self.db):
+            NumberSequence.number_documents(objs, 'student_receipt', 'receipt_number', 'SR')
+            created = super().bulk_create(objs, *args, **kwargs)
+            Studentenrollment.recalculate_amount_paid(*{receipt.enrollment_id for receipt in objs})
+        return created
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if self.AMOUNT_PAID_FIELDS.isdisjoint(fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        with db_transaction.atomic(using=self.db):
+            # Lock the rows so their previous enrollments cannot change underneath
+            previous_ids = self.model._default_manager.select_for_update().filter(
+                pk__in=[receipt.pk for receipt in objs]
+            ).values_list('enrollment_id', flat=True)
+            enrollment_ids = set(previous_ids) | {receipt.enrollment_id for receipt in objs}
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            Studentenrollment.recalculate_amount_paid(*enrollment_ids)
+        return updated
+    
+    def update(self, **kwargs):
+        if self.AMOUNT_PAID_FIELDS.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        with db_transaction.atomic(using=self.db):
+            rows = list(self.select_for_update().values_list('pk', 'enrollment_id'))
+            updated = super().update(**kwargs)
+            enrollment_ids = {enrollment_id for pk, enrollment_id in rows}
+            # Read the new enrollments back, as kwargs may hold expressions
+            enrollment_ids.update(self.model._default_manager.filter(
+                pk__in=[pk for pk, enrollment_id in rows]
+            ).values_list('enrollment_id', flat=True))
+            Studentenrollment.recalculate_amount_paid(*enrollment_ids)
+        return updated
+
+
 class StudentReceipt(models.Model):
     PAYMENT_METHOD_CHOICES = [
         ('CASH', 'نقد / Cash'),
@@ -795,10 +1247,17 @@ class StudentReceipt(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    POSTING_RELATED = ('student_profile__account', 'student', 'course', 'created_by')
+    objects = StudentReceiptQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'إيصال الطالب / Student Receipt'
         verbose_name_plural = 'إيصالات الطلاب / Student Receipts'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Paid-so-far lookups filter a student's receipts for one course, up to a date
+            models.Index(fields=['student_profile', 'course', 'date'], name='accounts_rcpt_student_idx'),
+        ]
 
     def __str__(self):
         return f"{self.receipt_number} - {self.student_name}"
@@ -806,7 +1265,17 @@ class StudentReceipt(models.Model):
     def save(self, *args, **kwargs):
         if not self.receipt_number:
             self.receipt_number = f"SR-{NumberSequence.next_value('student_receipt'):06d}"
-        super().save(*args, **kwargs)
+        with db_transaction.atomic():
+            # An edited receipt may have moved to another enrollment; the row
+            # lock keeps a concurrent move from leaving the old one stale
+            previous_enrollment_id = None
+            if self.pk:
+                previous_enrollment_id = (
+                    type(self).objects.select_for_update().filter(pk=self.pk)
+                    .values_list('enrollment_id', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            Studentenrollment.recalculate_amount_paid(self.enrollment_id, previous_enrollment_id)
 
     def get_absolute_url(self):
         return reverse('accounts:student_receipt_detail', kwargs={'pk': self.pk})
@@ -814,9 +1283,9 @@ class StudentReceipt(models.Model):
     @property
     def net_amount(self):
         """Calculate net amount after discounts"""
-        base_amount = self.amount or self.paid_amount or Decimal('0')
-        after_percent = base_amount - (base_amount * self.discount_percent / Decimal('100'))
-        return max(Decimal('0'), after_percent - self.discount_amount)
+        base_amount = self.amount or self.paid_amount or ZERO
+        net = base_amount * (100 - self.discount_percent) / 100 - self.discount_amount
+        return net if net > 0 else ZERO
 
     def get_student_name(self):
         if self.student_profile:
@@ -828,25 +1297,21 @@ class StudentReceipt(models.Model):
             return self.course.name
         return self.course_name
 
+    @db_transaction.atomic
     def create_accrual_journal_entry(self, user):
         """Create journal entry for student payment: DR Cash, CR Student AR"""
         if self.journal_entry:
             return self.journal_entry
+        if lock_posted_entry_id(self):
+            self.refresh_from_db(fields=['journal_entry'])
+            return self.journal_entry
         
-        paid_amount = self.paid_amount or Decimal('0')
+        paid_amount = self.paid_amount or ZERO
         if paid_amount <= 0:
             return None
         
         # Get accounts
-        cash_account, _ = Account.objects.get_or_create(
-            code='121',
-            defaults={
-                'name': 'Cash',
-                'name_ar': 'النقدية',
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
+        cash_account_id = Account.cash_account_id()
         
         student_ar_account = None
         if self.student_profile:
@@ -866,22 +1331,13 @@ class StudentReceipt(models.Model):
             created_by=user
         )
         
-        # DR: Cash
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=cash_account,
-            amount=paid_amount,
-            is_debit=True,
-            description=f"Cash received - {self.get_student_name()}"
-        )
-        
-        # CR: Student AR
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=student_ar_account,
-            amount=paid_amount,
-            is_debit=False,
-            description=f"Payment received - {self.get_course_name()}"
+        # DR: Cash, CR: Student AR
+        entry.add_double_entry(
+            cash_account_id,
+            student_ar_account.id,
+            paid_amount,
+            f"Cash received - {self.get_student_name()}",
+            f"Payment received - {self.get_course_name()}"
         )
         
         # Post the entry
@@ -889,7 +1345,7 @@ class StudentReceipt(models.Model):
         
         # Link to receipt
         self.journal_entry = entry
-        self.save(update_fields=['journal_entry'])
+        type(self).objects.filter(pk=self.pk).update(journal_entry=entry)
         
         return entry
 
@@ -902,7 +1358,6 @@ class ExpenseEntry(models.Model):
         ('CARD', 'بطاقة / Card'),
         ('TRANSFER', 'تحويل / Transfer'),
     ]
-    category = models.ForeignKey('Category', on_delete=models.CASCADE, null=True, blank=True)
     reference = models.CharField(max_length=50, unique=True, verbose_name='المرجع / Reference')
     date = models.DateField(verbose_name='التاريخ / Date')
     description = models.CharField(max_length=500, verbose_name='الوصف / Description')
@@ -922,6 +1377,10 @@ class ExpenseEntry(models.Model):
         verbose_name = 'قيد المصروف / Expense Entry'
         verbose_name_plural = 'قيود المصروفات / Expense Entries'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Serves the default ordering and the daily expense totals
+            models.Index(fields=['date', 'created_at'], name='accounts_exp_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.reference} - {self.description}"
@@ -934,16 +1393,17 @@ class ExpenseEntry(models.Model):
     def get_absolute_url(self):
         return reverse('accounts:expense_detail', kwargs={'pk': self.pk})
 
+    @db_transaction.atomic
     def create_journal_entry(self, user):
         """Create journal entry for expense: DR Expense Account, CR Cash/Bank"""
         if self.journal_entry:
             return self.journal_entry
-        
-        # Get expense account from the selected account
-        expense_account = self.account
+        if lock_posted_entry_id(self):
+            self.refresh_from_db(fields=['journal_entry'])
+            return self.journal_entry
         
         # Get payment account
-        payment_account = self.get_payment_account()
+        payment_account_id = self.get_payment_account_id()
         
         # Create journal entry
         entry = JournalEntry.objects.create(
@@ -954,22 +1414,13 @@ class ExpenseEntry(models.Model):
             created_by=user
         )
         
-        # DR: Expense Account
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=expense_account,
-            amount=self.amount,
-            is_debit=True,
-            description=self.description
-        )
-        
-        # CR: Payment Account
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=payment_account,
-            amount=self.amount,
-            is_debit=False,
-            description=f"Payment - {self.get_payment_method_display()}"
+        # DR: Expense Account, CR: Payment Account
+        entry.add_double_entry(
+            self.account_id,  # The selected expense account
+            payment_account_id,
+            self.amount,
+            self.description,
+            f"Payment - {self.get_payment_method_display()}"
         )
         
         # Post the entry
@@ -977,41 +1428,30 @@ class ExpenseEntry(models.Model):
         
         # Link to expense
         self.journal_entry = entry
-        self.save(update_fields=['journal_entry'])
+        type(self).objects.filter(pk=self.pk).update(journal_entry=entry)
         
         return entry
 
+    def get_payment_account_id(self):
+        """Id of the payment account for the payment method, memoized per process"""
+        code, name, name_ar = PAYMENT_ACCOUNTS.get(self.payment_method, PAYMENT_ACCOUNTS['CASH'])
+        return Account.get_account_id(code, {
+            'name': name,
+            'name_ar': name_ar,
+            'account_type': 'ASSET',
+            'is_active': True,
+        })
+
     def get_payment_account(self):
         """Get payment account based on payment method"""
-        account_mapping = {
-            'CASH': ('121', 'Cash', 'النقدية'),
-            'BANK': ('1120', 'Bank Account', 'حساب البنك'),
-            'CARD': ('1120', 'Bank Account', 'حساب البنك'),
-            'TRANSFER': ('1120', 'Bank Account', 'حساب البنك'),
-        }
-        
-        code, name, name_ar = account_mapping.get(self.payment_method, account_mapping['CASH'])
-        account, _ = Account.objects.get_or_create(
-            code=code,
-            defaults={
-                'name': name,
-                'name_ar': name_ar,
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
-        return account
+        return Account.objects.get(pk=self.get_payment_account_id())
 
     @property
     def category(self):
         """Get category from account code (503-599)"""
-        if self.account and self.account.code:
-            try:
-                account_code = int(self.account.code)
-                if 503 <= account_code <= 599:
-                    return self.account.name
-            except (ValueError, TypeError):
-                pass
+        code = self.account.code if self.account_id else ''
+        if code.isdigit() and 503 <= int(code) <= 599:
+            return self.account.name
         return "Other"
 
     def get_category_display(self):
@@ -1036,10 +1476,17 @@ class EmployeeAdvance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    POSTING_RELATED = ('employee__user',)
+    objects = PostingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'سلفة الموظف / Employee Advance'
         verbose_name_plural = 'سلف الموظفين / Employee Advances'
         ordering = ['-date']
+        indexes = [
+            # Outstanding advance totals filter on is_repaid
+            models.Index(fields=['is_repaid', 'date'], name='accounts_eadv_repaid_idx'),
+        ]
 
     def __str__(self):
         return f"{self.reference} - {self.employee_name}"
@@ -1059,24 +1506,21 @@ class EmployeeAdvance(models.Model):
     @property
     def outstanding_amount(self):
         """Calculate outstanding amount"""
-        return max(Decimal('0'), self.amount - self.repaid_amount)
+        remaining = self.amount - self.repaid_amount
+        return remaining if remaining > 0 else ZERO
 
+    @db_transaction.atomic
     def create_advance_entry(self, user):
         """Create advance journal entry: DR Employee Advance, CR Cash"""
         if self.journal_entry:
             return self.journal_entry
+        if lock_posted_entry_id(self):
+            self.refresh_from_db(fields=['journal_entry'])
+            return self.journal_entry
         
         # Get accounts
         advance_account = get_or_create_employee_advance_account(self.employee)
-        cash_account, _ = Account.objects.get_or_create(
-            code='121',
-            defaults={
-                'name': 'Cash',
-                'name_ar': 'النقدية',
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
+        cash_account_id = Account.cash_account_id()
         
         # Create journal entry
         entry = JournalEntry.objects.create(
@@ -1087,22 +1531,13 @@ class EmployeeAdvance(models.Model):
             created_by=user
         )
         
-        # DR: Employee Advance
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=advance_account,
-            amount=self.amount,
-            is_debit=True,
-            description=f"Advance - {self.employee_name}"
-        )
-        
-        # CR: Cash
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=cash_account,
-            amount=self.amount,
-            is_debit=False,
-            description=f"Cash advance payment"
+        # DR: Employee Advance, CR: Cash
+        entry.add_double_entry(
+            advance_account.id,
+            cash_account_id,
+            self.amount,
+            f"Advance - {self.employee_name}",
+            f"Cash advance payment"
         )
         
         # Post the entry
@@ -1110,7 +1545,7 @@ class EmployeeAdvance(models.Model):
         
         # Link to advance
         self.journal_entry = entry
-        self.save(update_fields=['journal_entry'])
+        type(self).objects.filter(pk=self.pk).update(journal_entry=entry)
         
         return entry
 
@@ -1118,6 +1553,12 @@ class EmployeeAdvance(models.Model):
         """Alias for create_advance_entry for compatibility"""
         return self.create_advance_entry(user)
 
+    @classmethod
+    def bulk_create_advance_entries(cls, advances, user):
+        """Post the entries of the given advances that are still unposted; see bulk_post_advances()"""
+        return bulk_post_advances(
+            cls, advances, user, 'employee_advance', 'employee',
+            "Employee advance", lambda advance: advance.employee_name)
 
 class TeacherAdvance(models.Model):
     teacher = models.ForeignKey('employ.Teacher', on_delete=models.CASCADE, related_name='advances', verbose_name='المعلم / Teacher')
@@ -1133,10 +1574,17 @@ class TeacherAdvance(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.PROTECT, verbose_name='أُنشئ بواسطة / Created By')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    POSTING_RELATED = ('teacher',)
+    objects = PostingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'سلفة المعلم / Teacher Advance'
         verbose_name_plural = 'سلف المعلمين / Teacher Advances'
         ordering = ['-date']
+        indexes = [
+            # Salary runs sum a teacher's unrepaid advances for a period
+            models.Index(fields=['teacher', 'is_repaid', 'date'], name='accounts_tadv_repaid_idx'),
+        ]
 
     def __str__(self):
         return f"Advance - {self.teacher.full_name} - {self.amount}"
@@ -1144,24 +1592,21 @@ class TeacherAdvance(models.Model):
     @property
     def outstanding_amount(self):
         """Calculate outstanding amount"""
-        return max(Decimal('0'), self.amount - self.repaid_amount)
+        remaining = self.amount - self.repaid_amount
+        return remaining if remaining > 0 else ZERO
 
+    @db_transaction.atomic
     def create_advance_journal_entry(self, user):
         """Create advance journal entry: DR Teacher Advance, CR Cash"""
         if self.journal_entry:
             return self.journal_entry
+        if lock_posted_entry_id(self):
+            self.refresh_from_db(fields=['journal_entry'])
+            return self.journal_entry
         
         # Get accounts
         advance_account = get_or_create_teacher_advance_account(self.teacher)
-        cash_account, _ = Account.objects.get_or_create(
-            code='121',
-            defaults={
-                'name': 'Cash',
-                'name_ar': 'النقدية',
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
+        cash_account_id = Account.cash_account_id()
         
         # Create journal entry
         entry = JournalEntry.objects.create(
@@ -1172,22 +1617,13 @@ class TeacherAdvance(models.Model):
             created_by=user
         )
         
-        # DR: Teacher Advance
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=advance_account,
-            amount=self.amount,
-            is_debit=True,
-            description=f"Advance - {self.teacher.full_name}"
-        )
-        
-        # CR: Cash
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=cash_account,
-            amount=self.amount,
-            is_debit=False,
-            description=f"Cash advance payment"
+        # DR: Teacher Advance, CR: Cash
+        entry.add_double_entry(
+            advance_account.id,
+            cash_account_id,
+            self.amount,
+            f"Advance - {self.teacher.full_name}",
+            f"Cash advance payment"
         )
         
         # Post the entry
@@ -1195,10 +1631,16 @@ class TeacherAdvance(models.Model):
         
         # Link to advance
         self.journal_entry = entry
-        self.save(update_fields=['journal_entry'])
+        type(self).objects.filter(pk=self.pk).update(journal_entry=entry)
         
         return entry
 
+    @classmethod
+    def bulk_create_advance_journal_entries(cls, advances, user):
+        """Post the entries of the given advances that are still unposted; see bulk_post_advances()"""
+        return bulk_post_advances(
+            cls, advances, user, 'teacher_advance', 'teacher',
+            "Teacher advance", lambda advance: advance.teacher.full_name)
 
 class Budget(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE, verbose_name='الحساب / Account')
@@ -1225,7 +1667,7 @@ class Budget(models.Model):
     def variance_percentage(self):
         if self.budgeted_amount > 0:
             return (self.variance / self.budgeted_amount) * 100
-        return Decimal('0')
+        return ZERO
 
     def calculate_variance(self):
         return self.variance
@@ -1272,141 +1714,192 @@ class StudentAccountLink(models.Model):
 
 
 # Helper functions for account creation
+# Per-person sub-accounts: parent code and defaults, then the sub-account names and type
+PERSON_ACCOUNTS = {
+    'teacher_salary': ('501', {'name': 'Teacher Salaries', 'name_ar': 'رواتب المدرسين'},
+                       'Salary Expense - {}', 'راتب - {}', 'EXPENSE'),
+    'teacher_dues': ('22', {'name': 'Teacher Dues', 'name_ar': 'مستحقات المدرسين'},
+                     'Teacher Dues - {}', 'مستحقات - {}', 'LIABILITY'),
+    'teacher_advance': ('1242', {'name': 'Teacher Advances', 'name_ar': 'سلف المدرسين'},
+                        'Teacher Advance - {}', 'سلفة - {}', 'ASSET'),
+    'employee_salary': ('502', {'name': 'Employee Salaries', 'name_ar': 'رواتب الموظفين'},
+                        'Salary Expense - {}', 'راتب - {}', 'EXPENSE'),
+    'employee_advance': ('1241', {'name': 'Employee Advances', 'name_ar': 'سلف الموظفين'},
+                         'Employee Advance - {}', 'سلفة - {}', 'ASSET'),
+}
+
+
+def person_account_parent_id(kind):
+    """Id of the parent account that per-person sub-accounts of this kind sit under"""
+    parent_code, parent_defaults, _name, _name_ar, account_type = PERSON_ACCOUNTS[kind]
+    return Account.get_account_id(parent_code, {
+        **parent_defaults, 'account_type': account_type, 'is_active': True,
+    })
+
+
+def person_account_fields(kind, person, parent_id):
+    """Code and field values of the per-person sub-account of this kind"""
+    parent_code, _parent_defaults, name, name_ar, account_type = PERSON_ACCOUNTS[kind]
+    return f"{parent_code}-{person.id:03d}", {
+        'name': name.format(person.full_name),
+        'name_ar': name_ar.format(person.full_name),
+        'account_type': account_type,
+        'parent_id': parent_id,
+        'is_active': True,
+    }
+
+
+def get_or_create_person_account(kind, person):
+    """Get or create the per-person sub-account of this kind"""
+    code, defaults = person_account_fields(kind, person, person_account_parent_id(kind))
+    return Account.objects.get_or_create(code=code, defaults=defaults)[0]
+
+
+def ensure_person_accounts(kind, people):
+    """Get or create the sub-accounts of this kind for many teachers or employees, mapped by person id
+    
+    Call it once before a bulk operation (e.g. a payroll run) instead of the
+    per-person helpers inside the loop: missing accounts are inserted with one
+    bulk_create that skips existing codes, then read back in one query.
+    """
+    people = list(people)
+    if not people:
+        return {}
+    parent_id = person_account_parent_id(kind)
+    people_by_code = {}
+    new_accounts = []
+    for person in people:
+        code, defaults = person_account_fields(kind, person, parent_id)
+        people_by_code[code] = person
+        new_accounts.append(Account(code=code, **defaults))
+    Account.objects.bulk_create(new_accounts, ignore_conflicts=True, batch_size=1000)
+    return {
+        people_by_code[account.code].id: account
+        for account in Account.objects.filter(code__in=people_by_code)
+    }
+
+
+def bulk_post_advances(model, advances, user, account_kind, person_field, label, person_name):
+    """Post the advance entries of many advances with JournalEntry.bulk_post()
+    
+    The advances are re-selected under a row lock and only those still
+    without a journal entry are posted, so a concurrent create_*_entry call
+    (which takes the same lock via lock_posted_entry_id) cannot post one
+    twice. The given instances get their new journal_entry set; the
+    created entries are returned.
+    """
+    advances = list(advances)
+    with db_transaction.atomic():
+        unposted = list(
+            model.objects.for_posting().select_for_update(of=('self',))
+            .filter(pk__in=[advance.pk for advance in advances], journal_entry__isnull=True)
+        )
+        advance_accounts = ensure_person_accounts(
+            account_kind, {getattr(advance, person_field) for advance in unposted})
+        person_id_field = f"{person_field}_id"
+        cash_account_id = Account.cash_account_id()
+        entries = JournalEntry.bulk_post([
+            {
+                'date': advance.date,
+                'description': f"{label} - {person_name(advance)}",
+                'entry_type': 'ADVANCE',
+                'amount': advance.amount,
+                'debit_account_id': advance_accounts[getattr(advance, person_id_field)].id,
+                'credit_account_id': cash_account_id,
+                'debit_description': f"Advance - {person_name(advance)}",
+                'credit_description': "Cash advance payment",
+            }
+            for advance in unposted
+        ], user)
+        for advance, entry in zip(unposted, entries):
+            advance.journal_entry = entry
+        model.objects.bulk_update(unposted, ['journal_entry'], batch_size=500)
+    # bulk_update sends no post_save signals
+    log_bulk_save(model, unposted, action='update')
+    
+    posted = {advance.pk: advance.journal_entry for advance in unposted}
+    for advance in advances:
+        if advance.pk in posted:
+            advance.journal_entry = posted[advance.pk]
+    return entries
+
+
 def get_or_create_teacher_salary_account(teacher):
     """Get or create salary expense account for teacher"""
-    # Ensure parent account exists
-    parent_account, _ = Account.objects.get_or_create(
-        code='501',
-        defaults={
-            'name': 'Teacher Salaries',
-            'name_ar': 'رواتب المدرسين',
-            'account_type': 'EXPENSE',
-            'is_active': True,
-        }
-    )
-    
-    # Create teacher-specific salary account
-    teacher_code = f"501-{teacher.id:03d}"
-    account, created = Account.objects.get_or_create(
-        code=teacher_code,
-        defaults={
-            'name': f"Salary Expense - {teacher.full_name}",
-            'name_ar': f"راتب - {teacher.full_name}",
-            'account_type': 'EXPENSE',
-            'parent': parent_account,
-            'is_active': True,
-        }
-    )
-    return account
+    return get_or_create_person_account('teacher_salary', teacher)
 
 
 def get_or_create_teacher_dues_account(teacher):
     """Get or create teacher dues liability account"""
-    # Ensure parent account exists
-    parent_account, _ = Account.objects.get_or_create(
-        code='22',
-        defaults={
-            'name': 'Teacher Dues',
-            'name_ar': 'مستحقات المدرسين',
-            'account_type': 'LIABILITY',
-            'is_active': True,
-        }
-    )
-    
-    # Create teacher-specific dues account
-    teacher_code = f"22-{teacher.id:03d}"
-    account, created = Account.objects.get_or_create(
-        code=teacher_code,
-        defaults={
-            'name': f"Teacher Dues - {teacher.full_name}",
-            'name_ar': f"مستحقات - {teacher.full_name}",
-            'account_type': 'LIABILITY',
-            'parent': parent_account,
-            'is_active': True,
-        }
-    )
-    return account
+    return get_or_create_person_account('teacher_dues', teacher)
 
 
 def get_or_create_teacher_advance_account(teacher):
     """Get or create teacher advance asset account"""
-    # Ensure parent account exists
-    parent_account, _ = Account.objects.get_or_create(
-        code='1242',
-        defaults={
-            'name': 'Teacher Advances',
-            'name_ar': 'سلف المدرسين',
-            'account_type': 'ASSET',
-            'is_active': True,
-        }
-    )
-    
-    # Create teacher-specific advance account
-    teacher_code = f"1242-{teacher.id:03d}"
-    account, created = Account.objects.get_or_create(
-        code=teacher_code,
-        defaults={
-            'name': f"Teacher Advance - {teacher.full_name}",
-            'name_ar': f"سلفة - {teacher.full_name}",
-            'account_type': 'ASSET',
-            'parent': parent_account,
-            'is_active': True,
-        }
-    )
-    return account
+    return get_or_create_person_account('teacher_advance', teacher)
 
 
 def get_or_create_employee_salary_account(employee):
     """Get or create salary expense account for employee"""
-    # Ensure parent account exists
-    parent_account, _ = Account.objects.get_or_create(
-        code='502',
-        defaults={
-            'name': 'Employee Salaries',
-            'name_ar': 'رواتب الموظفين',
-            'account_type': 'EXPENSE',
-            'is_active': True,
-        }
-    )
-    
-    # Create employee-specific salary account
-    employee_code = f"502-{employee.id:03d}"
-    account, created = Account.objects.get_or_create(
-        code=employee_code,
-        defaults={
-            'name': f"Salary Expense - {employee.full_name}",
-            'name_ar': f"راتب - {employee.full_name}",
-            'account_type': 'EXPENSE',
-            'parent': parent_account,
-            'is_active': True,
-        }
-    )
-    return account
+    return get_or_create_person_account('employee_salary', employee)
 
 
 def get_or_create_employee_advance_account(employee):
     """Get or create employee advance asset account"""
-    # Ensure parent account exists
-    parent_account, _ = Account.objects.get_or_create(
-        code='1241',
-        defaults={
-            'name': 'Employee Advances',
-            'name_ar': 'سلف الموظفين',
-            'account_type': 'ASSET',
-            'is_active': True,
-        }
-    )
+    return get_or_create_person_account('employee_advance', employee)
+
+# Signals: invalidate cached financial report dashboard figures and account ids
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+# Cache key holding the version number appended to dashboard cache keys
+DASHBOARD_CACHE_VERSION_KEY = 'accounts:dashboard:version'
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=CostCenter)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Studentenrollment)
+def bump_dashboard_cache_version(sender, **kwargs):
+    """Bump the dashboard cache version so cached figures are rebuilt"""
+    try:
+        cache.incr(DASHBOARD_CACHE_VERSION_KEY)
+    except ValueError:
+        # Nothing has been cached under a version yet
+        pass
+
+
+def transactions_bulk_created(transactions):
+    """Do what post_save would have done for ledger lines inserted with bulk_create
     
-    # Create employee-specific advance account
-    employee_code = f"1241-{employee.id:03d}"
-    account, created = Account.objects.get_or_create(
-        code=employee_code,
-        defaults={
-            'name': f"Employee Advance - {employee.full_name}",
-            'name_ar': f"سلفة - {employee.full_name}",
-            'account_type': 'ASSET',
-            'parent': parent_account,
-            'is_active': True,
-        }
-    )
-    return account
\ No newline at end of file
+    Writes their activity log rows (loading the account codes their __str__
+    shows in one query) and bumps the dashboard cache version.
+    """
+    prefetch_related_objects(transactions, Prefetch('account', queryset=Account.objects.only('code')))
+    log_bulk_save(Transaction, transactions)
+    bump_dashboard_cache_version(sender=Transaction)
+
+
+@receiver(post_delete, sender=StudentReceipt)
+def refresh_enrollment_amount_paid(sender, instance, **kwargs):
+    """Take a deleted receipt out of its enrollment's amount_paid_cached"""
+    Studentenrollment.recalculate_amount_paid(instance.enrollment_id)
+
+
+@receiver([post_save, post_delete], sender=Account)
+def forget_account_id(sender, instance, **kwargs):
+    """Drop a saved or deleted account from this process's get_account_id() memo
+    
+    Clears the entry under its current code and, via the code-by-id key,
+    the one under the code it was memoized with before a rename.
+    """
+    code_key = ACCOUNT_CODE_CACHE_KEY.format(instance.id)
+    codes = {instance.code, cache.get(code_key)} - {None}
+    cache.delete_many([code_key, *(ACCOUNT_ID_CACHE_KEY.format(code) for code in codes)])
+
+
+@receiver([post_save, post_delete], sender=Account)
+def forget_cash_account_ids(sender, instance, **kwargs):
+    """Clear the cash_account_ids() memo when a cash or bank account changes"""
+    if instance.code in CASH_ACCOUNT_CODES or instance.id in (cache.get(CASH_ACCOUNT_IDS_CACHE_KEY) or ()):
+        cache.delete(CASH_ACCOUNT_IDS_CACHE_KEY)
@@ -4,226 +4,215 @@ Exports all site content to Excel with proper formatting
 """
 
 from django.shortcuts import render
-from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
-from django.utils import timezone
-from datetime import datetime, date, timedelta
-from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Prefetch
 
 from .models import (
-    CostCenter, Transaction, JournalEntry, Account, 
-    Studentenrollment, ExpenseEntry, TeacherAdvance, EmployeeAdvance,
-    Course, CourseTeacherAssignment, StudentReceipt
+    CostCenter, Transaction, Studentenrollment, Course, CourseTeacherAssignment, JournalEntry,
+    DASHBOARD_CACHE_VERSION_KEY
 )
-from .excel_utils import FinancialReportExporter, create_excel_response, format_number_with_commas
-from employ.models import Teacher, Employee
+from .financial_reports_views import (
+    DASHBOARD_CACHE_TIMEOUT, fast_count, get_analysis_rows, get_cash_flow_rows, get_date_range
+)
+from employ.models import Teacher
 from students.models import Student
 
 
-@login_required
-def comprehensive_site_export(request):
-    """Export all site content to comprehensive Excel report"""
-    
-    # Get date range
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    if start_date:
-        try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        except ValueError:
-            start_date = None
-    
-    if end_date:
-        try:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            end_date = None
-    
-    # Default to current month if no dates provided
-    if not start_date and not end_date:
-        today = timezone.now().date()
-        start_date = today.replace(day=1)
-        next_month = start_date.replace(day=28) + timedelta(days=4)
-        end_date = next_month - timedelta(days=next_month.day)
-    
-    # Create comprehensive Excel workbook
-    exporter = FinancialReportExporter()
-    
-    # Remove default sheet
-    exporter.workbook.remove(exporter.workbook.active)
-    
-    # 1. Cost Center Analysis Sheet
-    cost_centers = CostCenter.objects.filter(is_active=True).order_by('code')
-    analysis_data = []
-    for cc in cost_centers:
-        data = {
-            'code': cc.code,
-            'name': cc.name_ar if cc.name_ar else cc.name,
-            'total_expenses': cc.get_total_expenses(start_date, end_date),
-            'teacher_salaries': cc.get_teacher_salaries(start_date, end_date),
-            'other_expenses': cc.get_other_expenses(start_date, end_date),
-            'total_revenue': cc.get_total_revenue(start_date, end_date),
-            'course_count': cc.get_course_count(),
-        }
-        analysis_data.append(data)
-    
-    analysis_sheet = exporter.workbook.create_sheet("Cost Center Analysis")
-    exporter.create_cost_center_analysis_report(analysis_data, start_date, end_date)
-    
-    # 2. Cash Flow Analysis Sheet
-    cash_flow_data = []
-    for cc in cost_centers:
-        data = {
-            'code': cc.code,
-            'name': cc.name_ar if cc.name_ar else cc.name,
-            'inflow': cc.get_cash_inflow(start_date, end_date),
-            'outflow': cc.get_cash_outflow(start_date, end_date),
-            'opening_balance': cc.get_opening_balance(start_date),
-        }
-        cash_flow_data.append(data)
-    
-    cash_flow_sheet = exporter.workbook.create_sheet("Cash Flow Analysis")
-    exporter.create_cost_center_cash_flow_report(cash_flow_data, start_date, end_date)
-    
-    # 3. Courses and Teachers Sheet
-    courses_sheet = exporter.workbook.create_sheet("Courses & Teachers")
-    exporter.formatter = exporter.formatter.__class__(exporter.workbook)
-    
-    # Courses and Teachers headers
-    exporter.formatter.format_header(courses_sheet, 1, 1, 8, 
-                                   "الدورات والمعلمين - Courses & Teachers")
-    
-    # Period information
-    if start_date and end_date:
-        period_text = f"الفترة من {start_date} إلى {end_date} - Period: {start_date} to {end_date}"
-        exporter.formatter.format_subheader(courses_sheet, 3, 1, 8, period_text)
-    
-    # Column headers
-    headers = [
-        "رمز الدورة", "اسم الدورة", "مركز التكلفة", "السعر",
-        "المدرس", "أجر الساعة", "الراتب الشهري", "إجمالي الراتب"
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        exporter.formatter.format_subheader(courses_sheet, 5, col, col, header)
-    
-    # Data rows
-    current_row = 6
-    courses = Course.objects.filter(is_active=True).prefetch_related('assigned_teachers', 'cost_center')
+# Sites with at least this many transactions and enrollments (table-wide
+# estimates, an upper bound on any period's rows) export with the direct-XML writer
+XML_EXPORT_MIN_ROWS = 20000
+
+# Column headers, fixed widths (write-only sheets cannot auto-fit) and
+# 0-based amount columns of the site export's own sheets
+COURSE_HEADERS = (
+    "رمز الدورة", "اسم الدورة", "مركز التكلفة", "السعر",
+    "المدرس", "أجر الساعة", "الراتب الشهري", "إجمالي الراتب"
+)
+COURSE_COLUMN_WIDTHS = (12, 30, 24, 14, 26, 14, 16, 16)
+COURSE_CURRENCY_COLUMNS = {3, 5, 6, 7}
+ENROLLMENT_HEADERS = (
+    "رقم الطالب", "اسم الطالب", "الدورة", "تاريخ التسجيل",
+    "المبلغ الإجمالي", "المبلغ المدفوع", "المتبقي"
+)
+ENROLLMENT_COLUMN_WIDTHS = (14, 28, 30, 14, 16, 16, 16)
+ENROLLMENT_CURRENCY_COLUMNS = {4, 5, 6}
+TRANSACTION_HEADERS = (
+    "التاريخ", "المرجع", "الحساب", "الوصف", "المبلغ",
+    "نوع القيد", "مركز التكلفة", "نوع المعاملة"
+)
+TRANSACTION_COLUMN_WIDTHS = (12, 14, 30, 40, 16, 10, 24, 18)
+TRANSACTION_CURRENCY_COLUMNS = {4}
+# Transaction sheet columns are read as plain tuples instead of model instances
+TRANSACTION_FIELDS = (
+    'journal_entry__date', 'journal_entry__reference', 'account__name_ar', 'account__name',
+    'description', 'amount', 'is_debit', 'cost_center_id', 'cost_center__name_ar', 'journal_entry__entry_type'
+)
+
+ENTRY_TYPES = dict(JournalEntry.ENTRY_TYPE_CHOICES)
+
+
+def course_rows():
+    """Yield one row per active teacher assignment, or per course without one"""
+    # Active assignments and their teachers are fetched in one extra query
+    courses = Course.objects.filter(is_active=True).select_related('cost_center').prefetch_related(
+        Prefetch(
+            'courseteacherassignment_set',
+            queryset=CourseTeacherAssignment.objects.filter(is_active=True).select_related('teacher'),
+            to_attr='active_assignments',
+        )
+    )
     
     for course in courses:
-        assignments = course.courseteacherassignment_set.filter(is_active=True)
+        course_name = course.name_ar or course.name
+        cost_center_name = course.cost_center.name_ar if course.cost_center else "غير محدد"
         
-        if assignments.exists():
-            for assignment in assignments:
-                exporter.formatter.format_data_cell(courses_sheet, current_row, 1, course.id)
-                exporter.formatter.format_data_cell(courses_sheet, current_row, 2, course.name_ar or course.name)
-                exporter.formatter.format_data_cell(courses_sheet, current_row, 3, 
-                                                  course.cost_center.name_ar if course.cost_center else "غير محدد")
-                exporter.formatter.format_currency_cell(courses_sheet, current_row, 4, course.price)
-                exporter.formatter.format_data_cell(courses_sheet, current_row, 5, assignment.teacher.full_name)
-                exporter.formatter.format_currency_cell(courses_sheet, current_row, 6, assignment.hourly_rate or 0)
-                exporter.formatter.format_currency_cell(courses_sheet, current_row, 7, assignment.monthly_rate or 0)
-                exporter.formatter.format_currency_cell(courses_sheet, current_row, 8, assignment.calculate_total_salary())
-                current_row += 1
+        if course.active_assignments:
+            for assignment in course.active_assignments:
+                yield (
+                    course.id, course_name, cost_center_name, course.price,
+                    assignment.teacher.full_name, assignment.hourly_rate or 0,
+                    assignment.monthly_rate or 0, assignment.calculate_total_salary(),
+                )
         else:
             # Course without teacher assignments
-            exporter.formatter.format_data_cell(courses_sheet, current_row, 1, course.id)
-            exporter.formatter.format_data_cell(courses_sheet, current_row, 2, course.name_ar or course.name)
-            exporter.formatter.format_data_cell(courses_sheet, current_row, 3, 
-                                              course.cost_center.name_ar if course.cost_center else "غير محدد")
-            exporter.formatter.format_currency_cell(courses_sheet, current_row, 4, course.price)
-            exporter.formatter.format_data_cell(courses_sheet, current_row, 5, "غير محدد")
-            exporter.formatter.format_currency_cell(courses_sheet, current_row, 6, 0)
-            exporter.formatter.format_currency_cell(courses_sheet, current_row, 7, 0)
-            exporter.formatter.format_currency_cell(courses_sheet, current_row, 8, 0)
-            current_row += 1
-    
-    exporter.formatter.auto_adjust_columns(courses_sheet)
-    
-    # 4. Students and enrollments Sheet
-    students_sheet = exporter.workbook.create_sheet("Students & enrollments")
-    
-    # Students and enrollments headers
-    exporter.formatter.format_header(students_sheet, 1, 1, 7, 
-                                   "الطلاب والتسجيلات - Students & enrollments")
+            yield (course.id, course_name, cost_center_name, course.price, "غير محدد", 0, 0, 0)
+
+
+def enrollment_rows(start_date, end_date):
+    """Yield the enrollments of the period"""
+    enrollments = Studentenrollment.objects.filter(
+        enrollment_date__gte=start_date,
+        enrollment_date__lte=end_date
+    ).select_related('student', 'course').only(
+        'student__student_number', 'student__full_name', 'course__name', 'course__name_ar',
+        'enrollment_date', 'total_amount', 'discount_percent', 'discount_amount', 'amount_paid_cached'
+    )
+    
+    # Stream the rows in chunks instead of caching every instance
+    for enrollment in enrollments.iterator(chunk_size=2000):
+        yield (
+            enrollment.student.student_number,
+            enrollment.student.full_name,
+            enrollment.course.name_ar or enrollment.course.name,
+            enrollment.enrollment_date.strftime('%Y-%m-%d'),
+            enrollment.total_amount,
+            enrollment.amount_paid,
+            enrollment.balance_due,
+        )
+
+
+def transaction_rows(start_date, end_date):
+    """Yield the transaction lines of the period"""
+    transactions = Transaction.objects.filter(
+        journal_entry__date__gte=start_date,
+        journal_entry__date__lte=end_date
+    ).values_list(*TRANSACTION_FIELDS)
+    
+    for (entry_date, reference, account_name_ar, account_name, description, amount,
+         is_debit, cost_center_id, cost_center_name, entry_type) in transactions.iterator(chunk_size=2000):
+        yield (
+            entry_date.strftime('%Y-%m-%d'),
+            reference,
+            account_name_ar or account_name,
+            description,
+            amount,
+            "مدين" if is_debit else "دائن",
+            cost_center_name if cost_center_id else "غير محدد",
+            ENTRY_TYPES.get(entry_type, entry_type),
+        )
+
+
+def add_sheet(exporter, title, heading, headers, widths, rows, currency_columns, start_date, end_date):
+    """Add a sheet with heading, period and column header rows, then its data rows
+    
+    Works with both FinancialReportExporter (write-only openpyxl, rows are
+    styled as an Excel table) and FinancialReportExporterXml.
+    """
+    from .excel_utils import FinancialReportExporterXml, XmlWorkbook
+    
+    if isinstance(exporter, FinancialReportExporterXml):
+        sheet = exporter.workbook.create_sheet(title, widths)
+        exporter.write_title(sheet, heading, headers, start_date, end_date)
+        styles = [
+            XmlWorkbook.CURRENCY if col in currency_columns else XmlWorkbook.DATA
+            for col in range(len(headers))
+        ]
+        for row in rows:
+            sheet.append(list(zip(row, styles)))
+        return sheet
+    
+    formatter = exporter.formatter
+    sheet = exporter.workbook.create_sheet(title)
+    formatter.set_column_widths(sheet, widths)
+    
+    sheet.append([formatter.header_cell(sheet, heading)])
+    formatter.merge_row(sheet, 1, 1, len(headers))
+    sheet.append([])
+    header_row = 3
     
     # Period information
     if start_date and end_date:
         period_text = f"الفترة من {start_date} إلى {end_date} - Period: {start_date} to {end_date}"
-        exporter.formatter.format_subheader(students_sheet, 3, 1, 7, period_text)
-    
-    # Column headers
-    headers = [
-        "رقم الطالب", "اسم الطالب", "الدورة", "تاريخ التسجيل",
-        "المبلغ الإجمالي", "المبلغ المدفوع", "المتبقي"
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        exporter.formatter.format_subheader(students_sheet, 5, col, col, header)
-    
-    # Data rows
-    current_row = 6
-    enrollments = Studentenrollment.objects.filter(
-        enrollment_date__gte=start_date,
-        enrollment_date__lte=end_date
-    ).select_related('student', 'course')
+        sheet.append([formatter.subheader_cell(sheet, period_text)])
+        formatter.merge_row(sheet, header_row, 1, len(headers))
+        sheet.append([])
+        header_row += 2
     
-    for enrollment in enrollments:
-        exporter.formatter.format_data_cell(students_sheet, current_row, 1, enrollment.student.student_id)
-        exporter.formatter.format_data_cell(students_sheet, current_row, 2, enrollment.student.name)
-        exporter.formatter.format_data_cell(students_sheet, current_row, 3, enrollment.course.name_ar or enrollment.course.name)
-        exporter.formatter.format_data_cell(students_sheet, current_row, 4, enrollment.enrollment_date.strftime('%Y-%m-%d'))
-        exporter.formatter.format_currency_cell(students_sheet, current_row, 5, enrollment.total_amount)
-        exporter.formatter.format_currency_cell(students_sheet, current_row, 6, enrollment.amount_paid)
-        exporter.formatter.format_currency_cell(students_sheet, current_row, 7, enrollment.balance_due)
-        current_row += 1
+    sheet.append([formatter.subheader_cell(sheet, header) for header in headers])
     
-    exporter.formatter.auto_adjust_columns(students_sheet)
+    # Data rows (each row is appended in one call)
+    cell_makers = [
+        formatter.currency_cell if col in currency_columns else formatter.data_cell
+        for col in range(len(headers))
+    ]
+    row_count = 0
+    for row in rows:
+        sheet.append([make_cell(sheet, value) for make_cell, value in zip(cell_makers, row)])
+        row_count += 1
     
-    # 5. Financial Transactions Sheet
-    transactions_sheet = exporter.workbook.create_sheet("Financial Transactions")
+    formatter.add_data_table(sheet, headers, header_row, header_row + row_count)
+    return sheet
+
+
+@login_required
+def comprehensive_site_export(request):
+    """Export all site content to comprehensive Excel report"""
+    # Excel writers are only loaded by export requests
+    from .excel_utils import FinancialReportExporter, FinancialReportExporterXml, create_excel_response
     
-    # Financial Transactions headers
-    exporter.formatter.format_header(transactions_sheet, 1, 1, 8, 
-                                   "المعاملات المالية - Financial Transactions")
+    # Get date range (defaults to the current month)
+    start_date, end_date = get_date_range(request)
     
-    # Period information
-    if start_date and end_date:
-        period_text = f"الفترة من {start_date} إلى {end_date} - Period: {start_date} to {end_date}"
-        exporter.formatter.format_subheader(transactions_sheet, 3, 1, 8, period_text)
+    # Create comprehensive Excel workbook; every sheet streams its rows, so
+    # cells are serialized as they are appended instead of held in memory.
+    # Large sites skip openpyxl cells altogether; the backend is chosen from
+    # cheap table estimates rather than counting the period's rows first.
+    if fast_count(Transaction) + fast_count(Studentenrollment) >= XML_EXPORT_MIN_ROWS:
+        exporter = FinancialReportExporterXml()
+    else:
+        exporter = FinancialReportExporter()
     
-    # Column headers
-    headers = [
-        "التاريخ", "المرجع", "الحساب", "الوصف", "المبلغ",
-        "نوع القيد", "مركز التكلفة", "نوع المعاملة"
-    ]
+    # 1. Cost Center Analysis Sheet (rows come from one annotated query)
+    exporter.create_cost_center_analysis_report(get_analysis_rows(start_date, end_date), start_date, end_date)
     
-    for col, header in enumerate(headers, 1):
-        exporter.formatter.format_subheader(transactions_sheet, 5, col, col, header)
+    # 2. Cash Flow Analysis Sheet
+    exporter.create_cost_center_cash_flow_report(get_cash_flow_rows(start_date, end_date), start_date, end_date)
     
-    # Data rows
-    current_row = 6
-    transactions = Transaction.objects.filter(
-        journal_entry__date__gte=start_date,
-        journal_entry__date__lte=end_date
-    ).select_related('journal_entry', 'account', 'cost_center')
+    # 3. Courses and Teachers Sheet
+    add_sheet(exporter, "Courses & Teachers", "الدورات والمعلمين - Courses & Teachers",
+              COURSE_HEADERS, COURSE_COLUMN_WIDTHS, course_rows(), COURSE_CURRENCY_COLUMNS,
+              start_date, end_date)
     
-    for transaction in transactions:
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 1, transaction.journal_entry.date.strftime('%Y-%m-%d'))
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 2, transaction.journal_entry.reference)
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 3, transaction.account.name_ar or transaction.account.name)
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 4, transaction.description)
-        exporter.formatter.format_currency_cell(transactions_sheet, current_row, 5, transaction.amount)
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 6, "مدين" if transaction.is_debit else "دائن")
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 7, 
-                                          transaction.cost_center.name_ar if transaction.cost_center else "غير محدد")
-        exporter.formatter.format_data_cell(transactions_sheet, current_row, 8, transaction.journal_entry.get_entry_type_display())
-        current_row += 1
+    # 4. Students and enrollments Sheet
+    add_sheet(exporter, "Students & enrollments", "الطلاب والتسجيلات - Students & enrollments",
+              ENROLLMENT_HEADERS, ENROLLMENT_COLUMN_WIDTHS, enrollment_rows(start_date, end_date),
+              ENROLLMENT_CURRENCY_COLUMNS, start_date, end_date)
     
-    exporter.formatter.auto_adjust_columns(transactions_sheet)
+    # 5. Financial Transactions Sheet
+    add_sheet(exporter, "Financial Transactions", "المعاملات المالية - Financial Transactions",
+              TRANSACTION_HEADERS, TRANSACTION_COLUMN_WIDTHS, transaction_rows(start_date, end_date),
+              TRANSACTION_CURRENCY_COLUMNS, start_date, end_date)
     
     # Generate filename
     filename = f"comprehensive_site_export_{start_date}_{end_date}.xlsx" if start_date and end_date else "comprehensive_site_export.xlsx"
@@ -231,27 +220,36 @@ def comprehensive_site_export(request):
     return create_excel_response(exporter.workbook, filename)
 
 
+def build_site_counts():
+    """Row counts shown on the site export dashboard"""
+    return {
+        'total_students': Student.objects.filter(is_active=True).count(),
+        'total_teachers': Teacher.objects.count(),
+        'total_courses': Course.objects.filter(is_active=True).count(),
+        'total_cost_centers': CostCenter.objects.filter(is_active=True).count(),
+        'total_transactions': fast_count(Transaction),
+    }
+
+
 @login_required
 def site_export_dashboard(request):
     """Dashboard for site-wide export options"""
     
-    # Get summary statistics
-    total_students = Student.objects.filter(is_active=True).count()
-    total_teachers = Teacher.objects.count()
-    total_courses = Course.objects.filter(is_active=True).count()
-    total_cost_centers = CostCenter.objects.filter(is_active=True).count()
-    total_transactions = Transaction.objects.count()
+    # Get summary statistics (cached briefly; saving a transaction, cost
+    # center, course or enrollment bumps the version and so invalidates them)
+    version = cache.get_or_set(DASHBOARD_CACHE_VERSION_KEY, 1, None)
+    counts = cache.get_or_set(f"accounts:site_export_counts:{version}", build_site_counts, DASHBOARD_CACHE_TIMEOUT)
     
-    # Get recent activity
-    recent_enrollments = Studentenrollment.objects.order_by('-enrollment_date')[:10]
-    recent_transactions = Transaction.objects.order_by('-created_at')[:10]
+    # Get recent activity (only the columns the dashboard shows)
+    recent_enrollments = Studentenrollment.objects.select_related('student', 'course').only(
+        'enrollment_date', 'total_amount', 'student__full_name', 'course__name', 'course__name_ar'
+    ).order_by('-enrollment_date')[:10]
+    recent_transactions = Transaction.objects.select_related('journal_entry', 'account').only(
+        'amount', 'is_debit', 'journal_entry__date', 'account__name', 'account__name_ar'
+    ).order_by('-created_at')[:10]
     
     context = {
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'total_courses': total_courses,
-        'total_cost_centers': total_cost_centers,
-        'total_transactions': total_transactions,
+        **counts,
         'recent_enrollments': recent_enrollments,
         'recent_transactions': recent_transactions,
     }
@@ -5,12 +5,32 @@ Provides comma-separated number formatting across the entire site
 
 from django import template
 from django.utils.safestring import mark_safe
-from decimal import Decimal
+from functools import lru_cache
 import locale
 
 register = template.Library()
 
 
+@lru_cache(maxsize=4096)
+def _cached_fmt(value, decimals):
+    try:
+        return f"{float(value):,.{decimals}f}"
+    except (ValueError, TypeError):
+        return None
+
+
+def _fmt(value, decimals=2):
+    """
+    Format a number with comma separators, or return None if it is not numeric.
+    Reports repeat the same amounts on many rows, so results are cached.
+    """
+    try:
+        return _cached_fmt(value, decimals)
+    except TypeError:
+        # Unhashable values cannot be cached (or formatted)
+        return None
+
+
 @register.filter
 def intcomma(value, use_l10n=True):
     """
@@ -20,23 +40,15 @@ def intcomma(value, use_l10n=True):
     if value is None:
         return ''
     
-    try:
-        # Convert to float first to handle Decimal values
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        # Format with commas
-        formatted = f"{value:,.2f}"
-        
-        # Remove unnecessary decimal places if it's a whole number
-        if formatted.endswith('.00'):
-            formatted = formatted[:-3]
-        
-        return formatted
-    except (ValueError, TypeError):
+    formatted = _fmt(value)
+    if formatted is None:
         return str(value)
+    
+    # Remove unnecessary decimal places if it's a whole number
+    if formatted.endswith('.00'):
+        formatted = formatted[:-3]
+    
+    return formatted
 
 
 @register.filter
@@ -47,20 +59,14 @@ def currency(value, currency_symbol=''):
     if value is None:
         return ''
     
-    try:
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        formatted = f"{value:,.2f}"
-        
-        if currency_symbol:
-            return f"{currency_symbol} {formatted}"
-        
-        return formatted
-    except (ValueError, TypeError):
+    formatted = _fmt(value)
+    if formatted is None:
         return str(value)
+    
+    if currency_symbol:
+        return f"{currency_symbol} {formatted}"
+    
+    return formatted
 
 
 @register.filter
@@ -71,16 +77,11 @@ def percentage(value, decimals=2):
     if value is None:
         return ''
     
-    try:
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        formatted = f"{value:,.{decimals}f}"
-        return f"{formatted}%"
-    except (ValueError, TypeError):
+    formatted = _fmt(value, decimals)
+    if formatted is None:
         return str(value)
+    
+    return f"{formatted}%"
 
 
 @register.filter
@@ -91,15 +92,8 @@ def number_format(value, decimals=2):
     if value is None:
         return ''
     
-    try:
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        return f"{value:,.{decimals}f}"
-    except (ValueError, TypeError):
-        return str(value)
+    formatted = _fmt(value, decimals)
+    return str(value) if formatted is None else formatted
 
 
 @register.simple_tag
@@ -110,20 +104,14 @@ def format_number(value, decimals=2, show_currency=False, currency_symbol=''):
     if value is None:
         return ''
     
-    try:
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        formatted = f"{value:,.{decimals}f}"
-        
-        if show_currency and currency_symbol:
-            return f"{currency_symbol} {formatted}"
-        
-        return formatted
-    except (ValueError, TypeError):
+    formatted = _fmt(value, decimals)
+    if formatted is None:
         return str(value)
+    
+    if show_currency and currency_symbol:
+        return f"{currency_symbol} {formatted}"
+    
+    return formatted
 
 
 @register.filter
@@ -144,13 +132,5 @@ def financial_format(value):
     if value is None:
         return '0.00'
     
-    try:
-        if isinstance(value, Decimal):
-            value = float(value)
-        elif isinstance(value, str):
-            value = float(value)
-        
-        # Always show 2 decimal places for financial values
-        return f"{value:,.2f}"
-    except (ValueError, TypeError):
-        return '0.00'
+    # Always show 2 decimal places for financial values
+    return _fmt(value) or '0.00'
@@ -0,0 +1,266 @@
+from datetime import date
+from decimal import Decimal
+import io
+import time
+from unittest import mock
+
+import openpyxl
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.excel_utils import FinancialReportExporter, XmlWorkbook, save_workbook
+from accounts.models import (
+    ACCOUNT_ID_CACHE_TIMEOUT, Account, Course, JournalEntry, StudentReceipt, Studentenrollment, TeacherAdvance
+)
+from employ.models import Teacher
+from pages.models import ActivityLog
+from students.models import Student
+
+
+class EnrollmentAmountPaidTests(TestCase):
+    """amount_paid_cached must equal the sum of the enrollment's receipts on every write path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cashier')
+        cls.student = Student.objects.create(full_name='Student')
+        cls.math = Course.objects.create(name='Math', price=Decimal('500'))
+        cls.physics = Course.objects.create(name='Physics', price=Decimal('300'))
+        cls.math_enrollment = Studentenrollment.objects.create(
+            student=cls.student, course=cls.math, enrollment_date=date.today(), total_amount=Decimal('500'))
+        cls.physics_enrollment = Studentenrollment.objects.create(
+            student=cls.student, course=cls.physics, enrollment_date=date.today(), total_amount=Decimal('300'))
+
+    def receipt(self, paid_amount, enrollment=None):
+        return StudentReceipt(
+            date=date.today(), student_name='Student', student_profile=self.student,
+            enrollment=enrollment or self.math_enrollment, paid_amount=Decimal(paid_amount),
+            created_by=self.user,
+        )
+
+    def assertPaid(self, enrollment, amount):
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.amount_paid, Decimal(amount))
+
+    def test_create(self):
+        self.receipt('40').save()
+        self.receipt('10').save()
+        self.assertPaid(self.math_enrollment, '50')
+        self.assertPaid(self.physics_enrollment, '0')
+
+    def test_edit(self):
+        receipt = self.receipt('40')
+        receipt.save()
+        receipt.paid_amount = Decimal('25')
+        receipt.save()
+        self.assertPaid(self.math_enrollment, '25')
+
+    def test_move_to_another_enrollment(self):
+        self.receipt('10').save()
+        receipt = self.receipt('40')
+        receipt.save()
+        receipt.enrollment = self.physics_enrollment
+        receipt.save()
+        self.assertPaid(self.math_enrollment, '10')
+        self.assertPaid(self.physics_enrollment, '40')
+
+    def test_delete(self):
+        self.receipt('10').save()
+        receipt = self.receipt('40')
+        receipt.save()
+        receipt.delete()
+        self.assertPaid(self.math_enrollment, '10')
+
+    def test_bulk_create(self):
+        self.receipt('40').save()
+        StudentReceipt.objects.bulk_create([
+            self.receipt('10', self.math_enrollment),
+            self.receipt('30', self.physics_enrollment),
+        ])
+        # Numbered from the same sequence as save()
+        self.assertEqual(
+            sorted(StudentReceipt.objects.values_list('receipt_number', flat=True)),
+            ['SR-000001', 'SR-000002', 'SR-000003'],
+        )
+        self.assertPaid(self.math_enrollment, '50')
+        self.assertPaid(self.physics_enrollment, '30')
+
+    def test_queryset_update_and_delete(self):
+        self.receipt('40').save()
+        self.receipt('10').save()
+        StudentReceipt.objects.filter(paid_amount=Decimal('10')).update(enrollment=self.physics_enrollment)
+        self.assertPaid(self.math_enrollment, '40')
+        self.assertPaid(self.physics_enrollment, '10')
+        StudentReceipt.objects.filter(enrollment=self.math_enrollment).delete()
+        self.assertPaid(self.math_enrollment, '0')
+
+    def test_bulk_update(self):
+        receipt = self.receipt('40')
+        receipt.save()
+        receipt.paid_amount = Decimal('15')
+        StudentReceipt.objects.bulk_update([receipt], ['paid_amount'])
+        self.assertPaid(self.math_enrollment, '15')
+
+
+class AccountIdMemoTests(TestCase):
+    """get_account_id() and cash_account_ids() must follow account code changes"""
+
+    def tearDown(self):
+        # The memos live in the cache, which outlasts each test's rolled back rows
+        cache.clear()
+
+    def test_renamed_account_is_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cash_id = Account.cash_account_id()
+        Account.objects.create(code='1120', name='Bank Account', account_type='ASSET')
+        self.assertIn(cash_id, Account.cash_account_ids())
+
+        cash = Account.objects.get(pk=cash_id)
+        cash.code = '121-OLD'
+        cash.save()
+
+        new_cash_id = Account.cash_account_id()
+        self.assertNotEqual(new_cash_id, cash_id)
+        self.assertEqual(Account.objects.get(pk=new_cash_id).code, '121')
+        self.assertNotIn(cash_id, Account.cash_account_ids())
+        self.assertIn(new_cash_id, Account.cash_account_ids())
+
+    def test_deleted_account_is_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cash_id = Account.cash_account_id()
+        Account.objects.filter(pk=cash_id).get().delete()
+        self.assertNotEqual(Account.cash_account_id(), cash_id)
+    
+    def test_rename_in_another_process_expires(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cash_id = Account.cash_account_id()
+        # No signal reaches this process's cache, as when another worker renames the account
+        Account.objects.filter(pk=cash_id).update(code='121-OLD')
+        self.assertEqual(Account.cash_account_id(), cash_id)
+        
+        expired = time.time() + ACCOUNT_ID_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            with self.captureOnCommitCallbacks(execute=True):
+                new_cash_id = Account.cash_account_id()
+        self.assertNotEqual(new_cash_id, cash_id)
+        self.assertEqual(Account.objects.get(pk=new_cash_id).code, '121')
+
+
+class SaveWorkbookTests(TestCase):
+    def test_round_trip(self):
+        exporter = FinancialReportExporter()
+        exporter.create_cost_center_cash_flow_report([{
+            'code': 'CC1', 'name': 'Main', 'inflow': Decimal('100'), 'outflow': Decimal('40'),
+            'opening_balance': Decimal('10'),
+        }], date(2024, 1, 1), date(2024, 1, 31))
+        output = io.BytesIO()
+        save_workbook(exporter.workbook, output)
+        output.seek(0)
+        sheet = openpyxl.load_workbook(output)['Cost Center Cash Flow']
+        self.assertEqual(sorted(str(ref) for ref in sheet.merged_cells.ranges), ['A1:G1', 'A3:G3'])
+        self.assertEqual([cell.value for cell in sheet[6]][:6], ['CC1', 'Main', 100, 40, 10, 70])
+        self.assertEqual(sheet['C6'].style, 'fin_currency')
+        self.assertEqual(list(sheet.tables), ['CostCenterCashFlow'])
+
+
+class XmlWorkbookTests(TestCase):
+    def test_control_characters_are_stripped(self):
+        output = io.BytesIO()
+        workbook = XmlWorkbook(output)
+        sheet = workbook.create_sheet('Transactions', (20, 12))
+        sheet.append([('pasted\x0b text\x00 <&>', XmlWorkbook.DATA), (Decimal('12.50'), XmlWorkbook.CURRENCY)])
+        workbook.close()
+        output.seek(0)
+        row = openpyxl.load_workbook(output).active[1]
+        self.assertEqual([cell.value for cell in row], ['pasted text <&>', 12.5])
+    
+    def test_cell_types(self):
+        output = io.BytesIO()
+        workbook = XmlWorkbook(output)
+        sheet = workbook.create_sheet('Types')
+        data = XmlWorkbook.DATA
+        sheet.append([(True, data), (3, data), (2.5, data), (date(2024, 1, 31), data)])
+        with self.assertRaises(TypeError):
+            sheet.append([(object(), data)])
+        workbook.close()
+        output.seek(0)
+        row = openpyxl.load_workbook(output).active[1]
+        self.assertEqual([cell.value for cell in row], [True, 3, 2.5, '2024-01-31'])
+    
+    def test_sheets_are_streamed_in_order(self):
+        output = io.BytesIO()
+        workbook = XmlWorkbook(output)
+        first = workbook.create_sheet('First')
+        first.append([('Title', XmlWorkbook.HEADER)])
+        first.merge_row(1, 1, 3)
+        second = workbook.create_sheet('Second')
+        for amount in range(3):
+            second.append([(amount, XmlWorkbook.CURRENCY)])
+        workbook.close()
+        output.seek(0)
+        loaded = openpyxl.load_workbook(output)
+        self.assertEqual(loaded.sheetnames, ['First', 'Second'])
+        self.assertEqual([str(ref) for ref in loaded['First'].merged_cells.ranges], ['A1:C1'])
+        self.assertEqual([row[0] for row in loaded['Second'].iter_rows(values_only=True)], [0, 1, 2])
+
+
+class BulkAdvancePostingTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_posted_advance_is_not_posted_again(self):
+        user = User.objects.create_user('accountant')
+        teacher = Teacher.objects.create(full_name='Teacher', phone_number='1')
+        advances = [
+            TeacherAdvance.objects.create(
+                teacher=teacher, date=date.today(), amount=Decimal(amount), purpose='Advance', created_by=user)
+            for amount in ('20', '30')
+        ]
+        # Posted elsewhere after these instances were loaded
+        TeacherAdvance.objects.get(pk=advances[0].pk).create_advance_journal_entry(user)
+
+        entries = TeacherAdvance.bulk_create_advance_journal_entries(advances, user)
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(JournalEntry.objects.filter(entry_type='ADVANCE').count(), 2)
+        self.assertEqual(advances[1].journal_entry, entries[0])
+        self.assertFalse(TeacherAdvance.objects.filter(journal_entry__isnull=True).exists())
+
+
+class AccountBalanceSignTests(TestCase):
+    def test_rollup_balances_match_net_balance(self):
+        user = User.objects.create_user('bookkeeper')
+        cash = Account.objects.create(code='121', name='Cash', account_type='ASSET')
+        revenue = Account.objects.create(code='41', name='Revenue', account_type='REVENUE')
+        tuition = Account.objects.create(code='411', name='Tuition', account_type='REVENUE', parent=revenue)
+        entry = JournalEntry.objects.create(
+            date=date.today(), description='Tuition', entry_type='MANUAL', total_amount=Decimal('75'), created_by=user)
+        entry.add_double_entry(cash.id, tuition.id, Decimal('75'), 'Cash', 'Tuition')
+
+        balances = Account.rollup_balances()
+        self.assertEqual(balances[cash.id], cash.get_net_balance())
+        self.assertEqual(balances[cash.id], Decimal('75.00'))
+        self.assertEqual(balances[tuition.id], tuition.get_net_balance())
+        self.assertEqual(balances[revenue.id], Decimal('75.00'))
+
+
+class BulkActivityLogTests(TestCase):
+    """Rows inserted with bulk_create must still reach the activity log"""
+    
+    def test_ledger_lines_and_reversals_are_logged(self):
+        user = User.objects.create_user('bookkeeper')
+        cash = Account.objects.create(code='121', name='Cash', account_type='ASSET')
+        revenue = Account.objects.create(code='41', name='Revenue', account_type='REVENUE')
+        entry = JournalEntry.objects.create(
+            date=date.today(), description='Tuition', entry_type='MANUAL', total_amount=Decimal('75'), created_by=user)
+        entry.add_double_entry(cash.id, revenue.id, Decimal('75'), 'Cash', 'Tuition')
+        entry.post_entry(user)
+        reversal = JournalEntry.bulk_reverse([entry], user)[0]
+        
+        logged = ActivityLog.objects.filter(action='create', content_type='Transaction')
+        self.assertEqual(logged.count(), 4)
+        self.assertIn('121 - 75 (Dr)', logged.values_list('object_repr', flat=True))
+        self.assertTrue(ActivityLog.objects.filter(
+            action='create', content_type='JournalEntry', object_id=reversal.id).exists())
@@ -17,7 +17,7 @@ from django.utils.decorators import method_decorator
 from .models import (
     Account, JournalEntry, Transaction, StudentReceipt, ExpenseEntry, 
     AccountingPeriod, Budget, Course, Student, Studentenrollment, EmployeeAdvance, 
-    CostCenter, DiscountRule
+    CostCenter, DiscountRule, DEBIT_NORMAL_TYPES, DISPLAY_NAME, net_balance
 )
 from .forms import (
     AccountForm, JournalEntryForm, TransactionFormSet, StudentReceiptForm, ExpenseEntryForm,
@@ -132,12 +132,15 @@ class ChartOfAccountsView(LoginRequiredMixin, ListView):
     context_object_name = 'accounts'
     
     def get_queryset(self):
-        from django.db.models import Prefetch
-        base = Account.objects.select_related('parent')
-        nested_children = Prefetch(
-            'children', queryset=Account.objects.select_related('parent').prefetch_related('children')
-        )
-        return base.prefetch_related(nested_children).filter(is_active=True).order_by('code')
+        return Account.objects.filter(is_active=True).order_by('code')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # One recursive query for every account's rollup balance
+        balances = Account.rollup_balances()
+        for account in context['accounts']:
+            account._rollup_balance = balances.get(account.id, Decimal('0.00'))
+        return context
 
 
 class AccountCreateView(LoginRequiredMixin, CreateView):
@@ -255,7 +258,16 @@ class JournalEntryDetailView(LoginRequiredMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['transactions'] = self.object.transactions.select_related('account').all()
+        transactions = list(self.object.transactions.select_related('account'))
+        # Totals come from the rows already loaded instead of one aggregate per use
+        total_debits = sum((t.amount for t in transactions if t.is_debit), Decimal('0.00'))
+        total_credits = sum((t.amount for t in transactions if not t.is_debit), Decimal('0.00'))
+        context.update({
+            'transactions': transactions,
+            'total_debits': total_debits,
+            'total_credits': total_credits,
+            'is_balanced': abs(total_debits - total_credits) < Decimal('0.01'),
+        })
         return context
 
 
@@ -360,27 +372,30 @@ class TrialBalanceView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get all accounts with transactions
-        accounts = Account.objects.filter(is_active=True).order_by('code')
+        # Get all accounts with their debit and credit totals (one query)
+        accounts = Account.objects.filter(is_active=True).annotate(
+            debit_total=Sum('transactions__amount', filter=Q(transactions__is_debit=True)),
+            credit_total=Sum('transactions__amount', filter=Q(transactions__is_debit=False)),
+        ).order_by('code')
         trial_balance_data = []
         total_debits = Decimal('0.00')
         total_credits = Decimal('0.00')
         
         for account in accounts:
-            debit_balance = account.get_debit_balance()
-            credit_balance = account.get_credit_balance()
-            net_balance = account.get_net_balance()
+            debit_balance = account.debit_total or Decimal('0.00')
+            credit_balance = account.credit_total or Decimal('0.00')
+            net_balance = account.net_balance_from(debit_balance, credit_balance)
             
             if debit_balance > 0 or credit_balance > 0:
                 if net_balance > 0:
-                    if account.account_type in ['ASSET', 'EXPENSE']:
+                    if account.account_type in DEBIT_NORMAL_TYPES:
                         debit_amount = net_balance
                         credit_amount = Decimal('0.00')
                     else:
                         debit_amount = Decimal('0.00')
                         credit_amount = net_balance
                 else:
-                    if account.account_type in ['ASSET', 'EXPENSE']:
+                    if account.account_type in DEBIT_NORMAL_TYPES:
                         debit_amount = Decimal('0.00')
                         credit_amount = abs(net_balance)
                     else:
@@ -485,12 +500,12 @@ class LedgerView(LoginRequiredMixin, TemplateView):
         
         for transaction in transactions:
             if transaction.is_debit:
-                if account.account_type in ['ASSET', 'EXPENSE']:
+                if account.account_type in DEBIT_NORMAL_TYPES:
                     running_balance += transaction.amount
                 else:
                     running_balance -= transaction.amount
             else:  # Credit
-                if account.account_type in ['LIABILITY', 'EQUITY', 'REVENUE']:
+                if account.account_type not in DEBIT_NORMAL_TYPES:
                     running_balance += transaction.amount
                 else:
                     running_balance -= transaction.amount
@@ -572,6 +587,8 @@ class StudentReceiptDetailView(LoginRequiredMixin, DetailView):
     model = StudentReceipt
     template_name = 'accounts/student_receipt_detail.html'
     context_object_name = 'receipt'
+    # The template lists the journal entry lines with their accounts
+    queryset = StudentReceipt.objects.select_related('journal_entry').prefetch_related('journal_entry__transactions__account')
 
 
 class ExpenseCreateView(LoginRequiredMixin, CreateView):
@@ -603,6 +620,8 @@ class ExpenseDetailView(LoginRequiredMixin, DetailView):
     model = ExpenseEntry
     template_name = 'accounts/expense_detail.html'
     context_object_name = 'expense'
+    # The template lists the journal entry lines with their accounts
+    queryset = ExpenseEntry.objects.select_related('journal_entry', 'account').prefetch_related('journal_entry__transactions__account')
 
 
 class ReceiptsExpensesView(LoginRequiredMixin, TemplateView):
@@ -685,7 +704,7 @@ class EmployeeAdvanceListView(LoginRequiredMixin, ListView):
     context_object_name = 'advances'
     
     def get_queryset(self):
-        return EmployeeAdvance.objects.select_related('created_by').order_by('-date')
+        return EmployeeAdvance.objects.select_related('created_by', 'journal_entry').order_by('-date')
 
 
 class EmployeeAdvanceCreateView(LoginRequiredMixin, CreateView):
@@ -723,6 +742,8 @@ class EmployeeAdvanceDetailView(LoginRequiredMixin, DetailView):
     model = EmployeeAdvance
     template_name = 'accounts/advance_detail.html'
     context_object_name = 'advance'
+    # The template lists the journal entry lines with their accounts
+    queryset = EmployeeAdvance.objects.select_related('journal_entry').prefetch_related('journal_entry__transactions__account')
 
 
 class OutstandingCoursesView(LoginRequiredMixin, TemplateView):
@@ -1160,13 +1181,28 @@ class enrollmentWithdrawView(LoginRequiredMixin, View):
         return redirect(reverse_lazy('accounts:reports'))
 
 
+def account_balance_rows(accounts):
+    """Yield (code, display name, type, net balance) per account from one query
+    
+    The display name is resolved in SQL and the debit and credit totals are
+    annotated, instead of loading each account and querying its balance.
+    """
+    accounts = accounts.annotate(
+        display_name=DISPLAY_NAME,
+        debit_total=Sum('transactions__amount', filter=Q(transactions__is_debit=True)),
+        credit_total=Sum('transactions__amount', filter=Q(transactions__is_debit=False)),
+    ).values_list('code', 'display_name', 'account_type', 'debit_total', 'credit_total')
+    for code, display_name, account_type, debit_total, credit_total in accounts:
+        net = net_balance(account_type, debit_total or Decimal('0.00'), credit_total or Decimal('0.00'))
+        yield code, display_name, account_type, net
+
+
 class TrialBalanceExportExcelView(LoginRequiredMixin, View):
     def get(self, request):
         accounts = Account.objects.filter(is_active=True).order_by('code')
         rows = []
-        for a in accounts:
-            net = a.get_net_balance()
-            rows.append({'Code': a.code, 'Name': a.display_name, 'Type': a.account_type, 'Net': float(net)})
+        for code, name, account_type, net in account_balance_rows(accounts):
+            rows.append({'Code': code, 'Name': name, 'Type': account_type, 'Net': float(net)})
         import pandas as pd
         df = pd.DataFrame(rows)
         resp = HttpResponse(content_type='application/vnd.ms-excel')
@@ -1179,8 +1215,8 @@ class IncomeStatementExportExcelView(LoginRequiredMixin, View):
     def get(self, request):
         rev = Account.objects.filter(account_type='REVENUE', is_active=True).order_by('code')
         exp = Account.objects.filter(account_type='EXPENSE', is_active=True).order_by('code')
-        rows = [{'Section': 'Revenue', 'Code': a.code, 'Name': a.display_name, 'Amount': float(a.get_net_balance())} for a in rev]
-        rows += [{'Section': 'Expense', 'Code': a.code, 'Name': a.display_name, 'Amount': float(a.get_net_balance())} for a in exp]
+        rows = [{'Section': 'Revenue', 'Code': code, 'Name': name, 'Amount': float(net)} for code, name, _, net in account_balance_rows(rev)]
+        rows += [{'Section': 'Expense', 'Code': code, 'Name': name, 'Amount': float(net)} for code, name, _, net in account_balance_rows(exp)]
         import pandas as pd
         df = pd.DataFrame(rows)
         resp = HttpResponse(content_type='application/vnd.ms-excel')
@@ -1195,9 +1231,9 @@ class BalanceSheetExportExcelView(LoginRequiredMixin, View):
         liab = Account.objects.filter(account_type='LIABILITY', is_active=True).order_by('code')
         eq = Account.objects.filter(account_type='EQUITY', is_active=True).order_by('code')
         rows = []
-        for a in assets: rows.append({'Section':'Assets','Code':a.code,'Name':a.display_name,'Amount':float(a.get_net_balance())})
-        for a in liab: rows.append({'Section':'Liabilities','Code':a.code,'Name':a.display_name,'Amount':float(a.get_net_balance())})
-        for a in eq: rows.append({'Section':'Equity','Code':a.code,'Name':a.display_name,'Amount':float(a.get_net_balance())})
+        for code, name, _, net in account_balance_rows(assets): rows.append({'Section':'Assets','Code':code,'Name':name,'Amount':float(net)})
+        for code, name, _, net in account_balance_rows(liab): rows.append({'Section':'Liabilities','Code':code,'Name':name,'Amount':float(net)})
+        for code, name, _, net in account_balance_rows(eq): rows.append({'Section':'Equity','Code':code,'Name':name,'Amount':float(net)})
         import pandas as pd
         df = pd.DataFrame(rows)
         resp = HttpResponse(content_type='application/vnd.ms-excel')
@@ -1209,7 +1245,9 @@ class BalanceSheetExportExcelView(LoginRequiredMixin, View):
 class LedgerExportExcelView(LoginRequiredMixin, View):
     def get(self, request, account_id):
         account = get_object_or_404(Account, id=account_id)
-        tx = Transaction.objects.filter(account=account).select_related('journal_entry').order_by('journal_entry__date', 'journal_entry__created_at')
+        tx = Transaction.objects.filter(account=account).select_related('journal_entry').only(
+            'amount', 'is_debit', 'description', 'journal_entry__date', 'journal_entry__reference'
+        ).order_by('journal_entry__date', 'journal_entry__created_at')
         rows = []
         rb = Decimal('0.00')
         for t in tx:
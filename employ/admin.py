@@ -37,6 +37,7 @@ class TeacherAdmin(admin.ModelAdmin):
 @admin.register(Vacation)
 class VacationAdmin(admin.ModelAdmin):
     list_display = ('employee', 'vacation_type', 'status', 'start_date', 'end_date', 'is_replacement_secured')
+    list_select_related = ('employee__user',)
     list_filter = ('vacation_type', 'status', 'is_replacement_secured', 'start_date', 'end_date')
     search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__user__username')
     ordering = ('-created_at',)
@@ -45,6 +46,7 @@ class VacationAdmin(admin.ModelAdmin):
 @admin.register(EmployeePermission)
 class EmployeePermissionAdmin(admin.ModelAdmin):
     list_display = ('employee', 'permission', 'is_granted', 'granted_by', 'granted_at')
+    list_select_related = ('employee__user', 'granted_by')
     list_filter = ('permission', 'is_granted', 'granted_at')
     search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__user__username')
     ordering = ('-granted_at',)
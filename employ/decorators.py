@@ -6,10 +6,16 @@ def emp_permission_required(code):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped(request, *args, **kwargs):
-            if request.user.is_authenticated and (
-                request.user.is_superuser or
-                getattr(request.user, 'employee_profile', None) and
-                request.user.employee_profile.permissions.filter(permission=code, is_granted=True).exists()
+            user = request.user
+            # EmployeePermissionsMiddleware already loaded the granted codes for this request
+            perms = getattr(request, "employee_permissions", None)
+            if perms is None:
+                employee = getattr(user, "employee_profile", None) if user.is_authenticated else None
+                perms = set(employee.permissions.filter(is_granted=True)
+                            .values_list("permission", flat=True)) if employee else set()
+                request.employee_permissions = perms
+            if user.is_authenticated and (
+                user.is_superuser or code in perms or "__ALL__" in perms
             ):
                 return view_func(request, *args, **kwargs)
             return HttpResponse("Service Unavailable", status=503)
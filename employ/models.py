@@ -446,7 +446,6 @@ class Teacher(models.Model):
             return existing_accrual
 
         # Get accounts
-        from accounts.models import Transaction
         teacher_salary_account = self.get_salary_account()
         teacher_dues_account = self.get_teacher_dues_account()
 
@@ -459,22 +458,13 @@ class Teacher(models.Model):
             created_by=user
         )
 
-        # DR: Salary Expense
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=teacher_salary_account,
-            amount=gross_salary,
-            is_debit=True,
-            description=f"Salary expense - {self.full_name}"
-        )
-
-        # CR: Teacher Dues
-        Transaction.objects.create(
-            journal_entry=entry,
-            account=teacher_dues_account,
-            amount=gross_salary,
-            is_debit=False,
-            description=f"Salary due - {self.full_name}"
+        # DR: Salary Expense, CR: Teacher Dues
+        entry.add_double_entry(
+            teacher_salary_account.id,
+            teacher_dues_account.id,
+            gross_salary,
+            f"Salary expense - {self.full_name}",
+            f"Salary due - {self.full_name}"
         )
 
         entry.post_entry(user)
@@ -497,15 +487,7 @@ class Teacher(models.Model):
         # Get accounts
         from accounts.models import Account, JournalEntry, Transaction
         teacher_dues_account = self.get_teacher_dues_account()
-        cash_account, _ = Account.objects.get_or_create(
-            code='121',
-            defaults={
-                'name': 'Cash',
-                'name_ar': 'النقدية',
-                'account_type': 'ASSET',
-                'is_active': True,
-            }
-        )
+        cash_account_id = Account.cash_account_id()
 
         if total_advances > 0:
             teacher_advance_account = self.get_teacher_advance_account()
@@ -532,7 +514,7 @@ class Teacher(models.Model):
         if net_salary > 0:
             Transaction.objects.create(
                 journal_entry=entry,
-                account=cash_account,
+                account_id=cash_account_id,
                 amount=net_salary,
                 is_debit=False,
                 description=f"Cash payment - {self.full_name}"
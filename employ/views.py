@@ -243,7 +243,7 @@ class EmployeeAdvanceListView(LoginRequiredMixin, ListView):
     context_object_name = 'advances'
 
     def get_queryset(self):
-        return EmployeeAdvance.objects.select_related('employee__user', 'created_by').order_by('-date')
+        return EmployeeAdvance.objects.select_related('employee__user', 'created_by', 'journal_entry').order_by('-date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -280,6 +280,8 @@ class EmployeeAdvanceDetailView(LoginRequiredMixin, DetailView):
     model = EmployeeAdvance
     template_name = 'employ/employee_advance_detail.html'
     context_object_name = 'advance'
+    # The template lists the journal entry lines with their accounts
+    queryset = EmployeeAdvance.objects.select_related('journal_entry').prefetch_related('journal_entry__transactions__account')
 
 
 class EmployeeAdvanceRepayView(LoginRequiredMixin, View):
@@ -1139,7 +1141,7 @@ class TeacherAdvanceListView(LoginRequiredMixin, ListView):
         teacher = get_object_or_404(Teacher, pk=self.kwargs['teacher_id'])
         return (TeacherAdvance.objects
                 .filter(teacher=teacher)
-                .select_related('teacher')
+                .select_related('teacher', 'journal_entry')
                 .order_by('-date', '-created_at'))
 
     def get_context_data(self, **kwargs):
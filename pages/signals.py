@@ -50,6 +50,34 @@ def log_save(sender, instance, created, **kwargs):
     except Exception as e:
         print(f"Error logging activity: {e}")
 
+def log_bulk_save(sender, instances, action='create'):
+    """يسجل نشاط الكائنات المحفوظة بـ bulk_create/bulk_update (ما بترسل post_save)"""
+    excluded_models = ['ActivityLog', 'LogEntry', 'Session', 'ContentType']
+    if sender.__name__ in excluded_models or not instances:
+        return
+
+    if not table_exists('pages_activitylog'):
+        return
+
+    try:
+        user = get_current_user()
+        if user and user.is_superuser:
+            return
+
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=user,
+                action=action,
+                content_type=sender.__name__,
+                object_id=instance.id,
+                object_repr=str(instance)[:200],
+                details=f"تم {action} {sender.__name__}: {instance}"
+            )
+            for instance in instances
+        ], batch_size=500)
+    except Exception as e:
+        print(f"Error logging bulk activity: {e}")
+
 @receiver(post_delete)
 def log_delete(sender, instance, **kwargs):
     excluded_models = ['ActivityLog', 'LogEntry', 'Session', 'ContentType']
@@ -44,13 +44,11 @@ class StudentProfileView(DetailView):
         
         # Get available courses for receipt generation
         from accounts.models import Course, CostCenter
-        from django.db.models import Sum
         
         # Get active course enrollments with remaining balance
         course_enrollments = (
             Studentenrollment.objects.filter(student=student, is_completed=False)
             .select_related('course')
-            .annotate(total_paid=Sum('payments__paid_amount'))
             .order_by('course__name')
         )
         
@@ -211,7 +209,6 @@ def student_profile(request, student_id):
         Studentenrollment.objects
         .filter(student=student, is_completed=False)
         .select_related('course')
-        .annotate(total_paid=Sum('payments__paid_amount'))
         .order_by('course__name')
     )
 
@@ -561,15 +558,7 @@ def withdraw_student(request, student_id):
         # Create withdrawal journal entry if there's a refund
         if refund_amount > 0:
             # Get accounts
-            cash_account, _ = Account.objects.get_or_create(
-                code='121',
-                defaults={
-                    'name': 'Cash',
-                    'name_ar': 'النقدية',
-                    'account_type': 'ASSET',
-                    'is_active': True,
-                }
-            )
+            cash_account_id = Account.cash_account_id()
 
             student_ar_account = student.ar_account
 
@@ -582,22 +571,13 @@ def withdraw_student(request, student_id):
                 created_by=request.user
             )
 
-            # DR: Student AR (reverse the payment)
-            Transaction.objects.create(
-                journal_entry=refund_entry,
-                account=student_ar_account,
-                amount=refund_amount,
-                is_debit=True,
-                description=f"Refund - {enrollment.course.name}"
-            )
-
-            # CR: Cash (refund payment)
-            Transaction.objects.create(
-                journal_entry=refund_entry,
-                account=cash_account,
-                amount=refund_amount,
-                is_debit=False,
-                description=f"Cash refund - {student.full_name}"
+            # DR: Student AR (reverse the payment), CR: Cash (refund payment)
+            refund_entry.add_double_entry(
+                student_ar_account.id,
+                cash_account_id,
+                refund_amount,
+                f"Refund - {enrollment.course.name}",
+                f"Cash refund - {student.full_name}"
             )
 
             # Post the refund entry
@@ -208,7 +208,8 @@ def test_site_wide_export():
             # Save the file for inspection
             filename = f"test_comprehensive_site_export_{date.today()}.xlsx"
             with open(filename, 'wb') as f:
-                f.write(response.content)
+                for chunk in response.streaming_content:
+                    f.write(chunk)
             print(f"✓ Export file saved as: {filename}")
         else:
             print(f"✗ Export test failed with status: {response.status_code}")